@@ -10,7 +10,13 @@ import sqlite3
 import pandas as pd
 from fpdf import FPDF
 import os
+import json
 from main import (main)
+from utils import load_lecture_halls
+from artifact_cache import clear_cache, input_hash
+from graph_update import load_pairs, update_cached_graph
+from repair import PREVIOUS_SCHEDULE
+from solver import CP_SAT_TIME_LIMIT, CP_SAT_WORKERS
 from dataProcessing.prc import (
     process_student_files,
     build_courses_and_students,
@@ -439,6 +445,7 @@ def upload_files():
         
         
         lecture_hall_processing(hall_file)
+        load_lecture_halls.cache_clear()
         
         
         #save nep file
@@ -457,10 +464,27 @@ def upload_files():
             cbcs_path = os.path.join(data_dir, "cbcs.csv")
             student_file_cbcs.save(cbcs_path)
         
+        # The previous enrollments, to patch the cached conflict graph rather than rebuild it
+        old_pairs = load_pairs()
+        old_key = input_hash() if os.path.exists('data/data_course.json') else None
+
         # Call our processing function to process student files
         courses_count = process_student_files(nep_path, common_path, cbcs_path)
-        
-        return jsonify({"message": "Files processed successfully!", "courses_count": courses_count}), 200
+
+        new_key = input_hash()
+        clashes = None
+        if old_key and old_key != new_key:
+            with open('data/data_student.json', 'r') as data_file:
+                student_courses = json.load(data_file)
+            clashes = update_cached_graph(old_key, new_key, old_pairs, load_pairs(), student_courses)
+        # Entries of the old data can never be hit again
+        clear_cache(keep=new_key)
+
+        response = {"message": "Files processed successfully!", "courses_count": courses_count}
+        if clashes is not None:
+            # Courses of the last schedule that the new enrollments put in conflict
+            response["conflicts"] = [list(pair) for pair in clashes]
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -474,7 +498,28 @@ def generate_schedule():
         mxs = request.form.get('max_slots')
         max_days = int(mxd)
         max_slots = int(mxs)
-        main(max_days, max_slots)  # calling the main scheduling function 
+        ordering = request.form.get('ordering', 'static')
+        backend = request.form.get('backend', 'greedy')
+        components = request.form.get('components', 'false').lower() == 'true'
+        starts = int(request.form.get('starts', 1))
+        seed = request.form.get('seed')
+        seed = int(seed) if seed else None
+        workers = request.form.get('workers')
+        workers = int(workers) if workers else None
+        improve = float(request.form.get('improve', 0))
+        auto_days = request.form.get('auto_days', 'false').lower() == 'true'
+        pack_halls = request.form.get('pack_halls', 'false').lower() == 'true'
+        all_cliques = request.form.get('all_cliques', 'false').lower() == 'true'
+        skip_bounds = request.form.get('skip_bounds', 'false').lower() == 'true'
+        repair = request.form.get('repair', 'false').lower() == 'true'
+        placement = request.form.get('placement', 'smallest')
+        kernelize = request.form.get('kernelize', 'false').lower() == 'true'
+        cp_sat_time_limit = float(request.form.get('cp_sat_time_limit', CP_SAT_TIME_LIMIT))
+        cp_sat_workers = int(request.form.get('cp_sat_workers', CP_SAT_WORKERS))
+        main(max_days, max_slots, ordering, backend, components, workers, starts, seed, improve, auto_days,
+             pack_halls, all_cliques, not skip_bounds, repair=PREVIOUS_SCHEDULE if repair else None,
+             placement=placement, kernelize=kernelize, cp_sat_time_limit=cp_sat_time_limit,
+             cp_sat_workers=cp_sat_workers)  # calling the main scheduling function 
         convert_csv_to_pdf('exam_schedule.csv', 'exam_schedule.pdf')
         convert_csv_to_pdf_venue('lecture_hall_schedule.csv', 'lecture_hall_schedule.pdf')
         convert_csv_to_pdf_seatingplan('seating_plan.csv', 'seating_plan.pdf')
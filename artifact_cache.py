@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+from scipy import sparse
+
+CACHE_DIR = "cache"
+# Files the conflict graph and its bounds are derived from
+INPUT_FILES = ("data/data_course.json",)
+
+
+def input_hash(paths=INPUT_FILES):
+    """
+    Hash of the contents of the input files; the key of every cache entry,
+    so an entry is never used once the data it was built from changes.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as data_file:
+            for chunk in iter(lambda: data_file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def entry_path(key, name):
+    return os.path.join(CACHE_DIR, key, name)
+
+
+def save_graph(key, codes, rosters, roll_numbers, conflicts):
+    """
+    Store the courses (codes and student-id rosters), the roll numbers the ids
+    refer to and the sparse conflict matrix. The matrix gives the degrees
+    (row lengths), adjacency (column indices) and max_adjacency (row maxima).
+    """
+    os.makedirs(os.path.join(CACHE_DIR, key), exist_ok=True)
+    lengths = [len(roster) for roster in rosters]
+    path = entry_path(key, "graph.npz")
+    # Written under another name first so a reader never sees half a file
+    partial = path + ".partial.npz"
+    np.savez_compressed(
+        partial,
+        codes=np.array(codes, dtype=str),
+        roll_numbers=np.array(roll_numbers, dtype=str),
+        roster_ids=np.concatenate(rosters) if rosters else np.zeros(0, dtype=np.int32),
+        roster_offsets=np.cumsum([0] + lengths),
+        data=conflicts.data,
+        indices=conflicts.indices,
+        indptr=conflicts.indptr,
+        shape=np.array(conflicts.shape),
+    )
+    os.replace(partial, path)
+
+
+def load_graph(key):
+    """
+    (codes, rosters, roll numbers, conflict matrix) stored under the key, or
+    None on a miss.
+    """
+    path = entry_path(key, "graph.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as entry:
+        offsets = entry["roster_offsets"]
+        roster_ids = entry["roster_ids"]
+        rosters = [roster_ids[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        conflicts = sparse.csr_matrix(
+            (entry["data"], entry["indices"], entry["indptr"]), shape=tuple(entry["shape"])
+        )
+        return entry["codes"].tolist(), rosters, entry["roll_numbers"].tolist(), conflicts
+
+
+def save_bounds(key, enumerate_cliques, bounds):
+    """Store the result of compute_bounds."""
+    os.makedirs(os.path.join(CACHE_DIR, key), exist_ok=True)
+    clique_number, exact, hoffman_bound = bounds
+    with open(entry_path(key, f"bounds_{int(enumerate_cliques)}.json"), 'w') as f:
+        json.dump({
+            "clique_number": int(clique_number),
+            "exact": bool(exact),
+            "hoffman_bound": float(hoffman_bound),
+        }, f)
+
+
+def load_bounds(key, enumerate_cliques):
+    """(clique number, exact, Hoffman bound) stored under the key, or None on a miss."""
+    path = entry_path(key, f"bounds_{int(enumerate_cliques)}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        bounds = json.load(f)
+    return bounds["clique_number"], bounds["exact"], bounds["hoffman_bound"]
+
+
+def clear_cache(keep=None):
+    """Drop every cache entry but the one under keep, e.g. after new data has been uploaded."""
+    if keep is None:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for key in os.listdir(CACHE_DIR):
+        if key != keep:
+            shutil.rmtree(os.path.join(CACHE_DIR, key), ignore_errors=True)
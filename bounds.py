@@ -0,0 +1,115 @@
+import time
+
+CLIQUE_TIME_LIMIT = 10.0  # seconds
+GREEDY_STARTS = 50  # highest-degree courses a greedy clique is grown from
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def greedy_clique(adjacency, starts=GREEDY_STARTS):
+    """
+    Grow a clique from each of the highest-degree vertices, always adding the
+    candidate with the most neighbours among the remaining candidates.
+    adjacency maps each vertex to the set of its neighbours.
+    """
+    best = []
+    for start in sorted(adjacency, key=lambda v: len(adjacency[v]), reverse=True)[:starts]:
+        clique = [start]
+        candidates = set(adjacency[start])
+        while candidates:
+            v = max(candidates, key=lambda u: len(adjacency[u] & candidates))
+            clique.append(v)
+            candidates &= adjacency[v]
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def peel(adjacency, threshold):
+    """
+    Repeatedly set aside the vertices with fewer than threshold neighbours
+    among the vertices left; what remains is the threshold-core. adjacency
+    maps each vertex to its neighbours.
+
+    Returns (core, peeled) with peeled in removal order: each peeled vertex has
+    fewer than threshold neighbours in the core and the vertices peeled after it.
+    """
+    degree = {v: len(adjacency[v]) for v in adjacency}
+    stack = [v for v in adjacency if degree[v] < threshold]
+    removed = set()
+    peeled = []
+    while stack:
+        v = stack.pop()
+        if v in removed:
+            continue
+        removed.add(v)
+        peeled.append(v)
+        for u in adjacency[v]:
+            if u not in removed:
+                degree[u] -= 1
+                if degree[u] < threshold:
+                    stack.append(u)
+    return [v for v in adjacency if v not in removed], peeled
+
+
+def color_sort(candidates, adjacency):
+    """
+    Greedy coloring of the candidates; returns them ordered by color class
+    with the number of colors used up to each one, the bound of MCQ.
+    """
+    order, bounds = [], []
+    uncolored = list(candidates)
+    color = 0
+    while uncolored:
+        color += 1
+        independent, rest = [], []
+        for v in uncolored:
+            if adjacency[v].isdisjoint(independent):
+                independent.append(v)
+            else:
+                rest.append(v)
+        order.extend(independent)
+        bounds.extend([color] * len(independent))
+        uncolored = rest
+    return order, bounds
+
+
+def max_clique(adjacency, time_limit=CLIQUE_TIME_LIMIT):
+    """
+    Maximum clique by branch and bound (Tomita's MCQ with coloring bounds),
+    starting from a greedy clique. Stops at the time limit with the largest
+    clique found so far.
+
+    Returns (clique, exact); exact is False when the search timed out, the
+    clique then being only a lower bound on the clique number.
+    """
+    best = greedy_clique(adjacency)
+    # A larger clique lies in the core where every vertex has at least len(best) neighbours
+    vertices, _ = peel(adjacency, len(best))
+    vertices.sort(key=lambda v: len(adjacency[v]), reverse=True)
+    deadline = time.time() + time_limit
+
+    def expand(candidates, clique):
+        nonlocal best
+        if time.time() > deadline:
+            raise SearchTimeout
+        order, bounds = color_sort(candidates, adjacency)
+        for i in range(len(order) - 1, -1, -1):
+            if len(clique) + bounds[i] <= len(best):
+                return
+            v = order[i]
+            clique.append(v)
+            remaining = [u for u in order[:i] if u in adjacency[v]]
+            if remaining:
+                expand(remaining, clique)
+            elif len(clique) > len(best):
+                best = list(clique)
+            clique.pop()
+
+    try:
+        expand(vertices, [])
+    except SearchTimeout:
+        return best, False
+    return best, True
@@ -1,98 +1,140 @@
+import numpy as np
+
 from models.course import Course
 from models.color import Color
-from models.student import Student
-from models.lecture_hall import LectureHall
-from typing import Set
-
-
-class Constraints:
-     
-    def __init__(self, scheduler):
-        self.scheduler = scheduler
-
-    def no_exam_clashes(self, course: Course, color: Color) -> bool:
-        for scheduled_course in color.courses:
-             
-            if course.student_list & scheduled_course.student_list:
-                
-                return False
-        return True
-
-    def minimum_gap(self, course: Course, color: Color, min_gap: int = 1) -> bool:
-        day = color.day
-        slot = color.slot
-        total_slots = self.scheduler.time_slots
-        max_days = self.scheduler.max_days
-
-        for student in course.student_list:
-            
-            for offset in range(-min_gap, min_gap + 1):
-                if offset == 0:
-                    continue   
-                check_slot_index = day * total_slots + slot + offset
-                check_day = check_slot_index // total_slots
-                check_slot = check_slot_index % total_slots
-
-                if 0 <= check_day < max_days and 0 <= check_slot < total_slots:
-                    other_color = self.scheduler.color_matrix[check_day][check_slot]
-                    for scheduled_course in other_color.courses:
-                        if student in scheduled_course.student_list:
-                            # Found a student with exams too close together
-                            return False
-        return True
-
-    def maximum_exams_per_day(self, course: Course, color: Color, max_exams: int = 2) -> bool:
-        day = color.day
-        for student in course.student_list:
-            exam_count = 0
-            for slot in range(self.scheduler.time_slots):
-                other_color = self.scheduler.color_matrix[day][slot]
-                for scheduled_course in other_color.courses:
-                    if student in scheduled_course.student_list:
-                        exam_count += 1
-                        if exam_count >= max_exams:
-                            # Student has reached or exceeded the maximum exams per day
-                            return False
-        return True
-
-    def no_consecutive_exams(self, course: Course, color: Color) -> bool:
-        day = color.day
-        slot = color.slot
-
-        adjacent_slots = []
-        if slot > 0:
-            adjacent_slots.append(slot - 1)
-        if slot < self.scheduler.time_slots - 1:
-            adjacent_slots.append(slot + 1)
-
-        for adj_slot in adjacent_slots:
-            adj_color = self.scheduler.color_matrix[day][adj_slot]
-            for scheduled_course in adj_color.courses:
-                if course.student_list & scheduled_course.student_list:
-                    # Found a student with consecutive exams
-                    return False
-        return True
-
-    def room_capacity(self, course: Course, color: Color) -> bool:
-        capacity_available = color.capacity_available()
-        if course.no_of_students > capacity_available:
-            return False
-        return True
-
-    def is_suitable(self, course: Course, color: Color) -> bool:
-        if not self.room_capacity(course, color):
-            return False
-        if not self.no_exam_clashes(course, color):
-            return False
-        if not self.no_consecutive_exams(course, color):
-            return False
-        if not self.maximum_exams_per_day(course, color):
-            return False
-        if not self.minimum_gap(course, color):
-            return False
-        return True
 
+# Rules the relaxation cascade may switch off; the hard rules always apply
+SOFT_RULES = ("no_consecutive_exams", "maximum_exams_per_day", "minimum_gap")
+HARD_RULES = ("no_exam_clashes", "room_capacity")
+# Cheapest first: bit operations, then O(slots), then O(students x days)
+RULE_ORDER = ("no_exam_clashes", "no_consecutive_exams", "minimum_gap", "room_capacity", "maximum_exams_per_day")
 
 
+def _bitmask(flags: np.ndarray) -> int:
+    """Bitmask of the positions set in a boolean array."""
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
 
 
+class Constraints:
+    """
+    The scheduling rules of one schedule. Each rule returns the colors it
+    forbids a course as a bitmask over the flattened days x slots grid, so a
+    single call judges every candidate color. Rules read the shared indexes
+    of the schedule (the courses' forbidden masks, the exam occupancy and the
+    seat table) and rule sets are compiled once, cheapest rule first.
+    """
+
+    def __init__(self, color_matrix, max_days: int, max_slots: int):
+        self.color_matrix = color_matrix
+        self.max_days = max_days
+        self.time_slots = max_slots
+        self.occupancy = color_matrix[0][0].occupancy
+        self.hall_table = color_matrix[0][0].hall_table
+        self.all_colors = (1 << (max_days * max_slots)) - 1
+        self.day_masks = [((1 << max_slots) - 1) << (day * max_slots) for day in range(max_days)]
+        self._compiled = {}
+
+    def compile(self, rules):
+        """The rule methods of a rule set and the hard rules, cheapest first."""
+        key = frozenset(rules)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            selected = key | set(HARD_RULES)
+            compiled = tuple(getattr(self, name) for name in RULE_ORDER if name in selected)
+            self._compiled[key] = compiled
+        return compiled
+
+    def available(self, course: Course, rules=SOFT_RULES) -> int:
+        """Bitmask of the colors the course may take under the rule set."""
+        available = self.all_colors
+        for rule in self.compile(rules):
+            available &= ~rule(course)
+            if not available:
+                break
+        return available
+
+    def no_exam_clashes(self, course: Course) -> int:
+        return course.forbidden_mask
+
+    def no_consecutive_exams(self, course: Course) -> int:
+        return course.forbidden_consecutive
+
+    def minimum_gap(self, course: Course) -> int:
+        # Less than 4 colors apart from an adjacent course
+        return course.forbidden_spacing
+
+    def room_capacity(self, course: Course) -> int:
+        # Running counters of the seat table, no hall is looked at
+        if self.hall_table is not None:
+            return _bitmask(self.hall_table.seatable.ravel() < course.no_of_students)
+        forbidden = 0
+        for row in self.color_matrix:
+            for color in row:
+                if course.no_of_students > color.max_course_seats():
+                    forbidden |= color.mask
+        return forbidden
+
+    def maximum_exams_per_day(self, course: Course, max_exams: int = 2) -> int:
+        rows, _ = course.occupancy_rows()
+        if self.occupancy is not None and rows is not None:
+            if len(rows) == 0:
+                return 0
+            full_days = self.occupancy.exams_per_day[rows].max(axis=0) >= max_exams
+        else:
+            full_days = [self._day_exams(course, day) >= max_exams for day in range(self.max_days)]
+
+        forbidden = 0
+        for day in np.flatnonzero(full_days).tolist():
+            forbidden |= self.day_masks[day]
+        return forbidden
+
+    def _day_exams(self, course: Course, day: int) -> int:
+        """Most exams any student of the course has on the day, from the rosters."""
+        most = 0
+        for student in course.student_list:
+            exams = sum(
+                student in scheduled_course.student_list
+                for slot in range(self.time_slots)
+                for scheduled_course in self.color_matrix[day][slot].courses
+            )
+            most = max(most, exams)
+        return most
+
+    def evaluate(self, course: Course, rules=SOFT_RULES):
+        """
+        The course in every color at once, as arrays over the flattened grid:
+        whether the rule set allows it, and its soft-rule cost (see violations).
+        """
+        positions = self.max_days * self.time_slots
+        available = self.available(course, rules)
+        flags = np.frombuffer(available.to_bytes(positions // 8 + 1, 'little'), dtype=np.uint8)
+        feasible = np.unpackbits(flags, bitorder='little')[:positions].astype(bool)
+        return feasible, self.violations(course)
+
+    def violations(self, course: Course) -> np.ndarray:
+        """
+        For every color, the students of the course it would give an exam in
+        the next or previous slot of the day, an exam less than 4 colors away
+        or a third exam that day, counted like schedule_violations.
+        """
+        positions = self.max_days * self.time_slots
+        rows, weights = course.occupancy_rows()
+        if self.occupancy is None or rows is None or len(rows) == 0:
+            return np.zeros(positions, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(rows), dtype=np.int64)
+
+        # Rows are enrollment profiles, each counted for its students
+        exams = weights @ self.occupancy.flat_exams[rows].astype(np.int64)
+        padded = np.concatenate([np.zeros(3, dtype=np.int64), exams, np.zeros(3, dtype=np.int64)])
+        spacing = sum(padded[3 + offset:3 + offset + positions] for offset in (-3, -2, -1, 1, 2, 3))
+
+        slot = np.arange(positions) % self.time_slots
+        consecutive = np.where(slot > 0, padded[2:2 + positions], 0)
+        consecutive += np.where(slot < self.time_slots - 1, padded[4:4 + positions], 0)
+
+        full_days = weights @ (self.occupancy.exams_per_day[rows] >= 2).astype(np.int64)
+        return consecutive + spacing + np.repeat(full_days, self.time_slots)
+
+    def is_suitable(self, course: Course, color: Color, rules=SOFT_RULES) -> bool:
+        return bool(self.available(course, rules) & color.mask)
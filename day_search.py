@@ -0,0 +1,83 @@
+import math
+
+from multistart import capture_schedule, restore_schedule
+from solver import schedule_courses
+from utils import initialize_schedule, get_slot_capacity, occupancy_size
+
+
+def minimum_colors(courses, clique_number, hoffman_bound, slot_capacity):
+    """
+    Lower bound on the colors (day-slots) any schedule needs: the largest
+    clique, the Hoffman bound and the students over the seats of one slot.
+    """
+    seats = sum(course.no_of_students for course in courses)
+    return max(
+        1,
+        clique_number,
+        math.ceil(round(hoffman_bound, 6)),
+        math.ceil(seats / max(slot_capacity)) if max(slot_capacity) else 1,
+    )
+
+
+def probe_days(courses, graph, no_of_students, days, max_slots, ordering):
+    """
+    Schedule every course into days days with the greedy cascade, reusing the
+    conflict graph and courses. Returns the captured schedule, or None when
+    some course is left unscheduled.
+    """
+    for course in courses:
+        course.reset_schedule()
+    color_matrix, no_of_unscheduled_courses = schedule_courses(
+        courses, graph, no_of_students, days, max_slots, ordering
+    )
+    print(f"Probe {days} day(s): {no_of_unscheduled_courses} course(s) unscheduled")
+    if no_of_unscheduled_courses:
+        return None
+    return capture_schedule(color_matrix)
+
+
+def search_min_days(courses, graph, no_of_students, max_days, max_slots, clique_number,
+                    hoffman_bound, ordering="static"):
+    """
+    Find the fewest days the greedy cascade fits every course into.
+
+    The lower bound (minimum_colors over max_slots) is probed first and ends
+    the search when feasible. Otherwise max_days is the first upper guess,
+    doubled until a probe succeeds, and the days in between are bisected.
+    Returns (days, color_matrix, lower bound in days) with the courses holding
+    the schedule of the smallest feasible calendar.
+    """
+    slot_capacity = get_slot_capacity(initialize_schedule(0, 1, max_slots), 1, max_slots)
+    lower = math.ceil(minimum_colors(courses, clique_number, hoffman_bound, slot_capacity) / max_slots)
+    # One course per slot fits any calendar, so more days than this never help
+    limit = max(lower, math.ceil(len(courses) / max_slots))
+
+    best_days, best = lower, probe_days(courses, graph, no_of_students, lower, max_slots, ordering)
+    if best is None:
+        low, high = lower + 1, max(max_days, lower + 1)
+        while True:
+            best_days, best = high, probe_days(courses, graph, no_of_students, high, max_slots, ordering)
+            if best is not None:
+                break
+            if high >= limit:
+                raise ValueError(
+                    f"Courses could not be scheduled in {high} days of {max_slots} slot(s). "
+                    "Consider increasing the number of time slots."
+                )
+            low, high = high + 1, min(high * 2, limit)
+
+        high -= 1
+        while low <= high:
+            mid = (low + high) // 2
+            schedule = probe_days(courses, graph, no_of_students, mid, max_slots, ordering)
+            if schedule is None:
+                low = mid + 1
+            else:
+                best_days, best = mid, schedule
+                high = mid - 1
+
+    for course in courses:
+        course.reset_schedule()
+    color_matrix = initialize_schedule(occupancy_size(courses, no_of_students), best_days, max_slots)
+    restore_schedule(best, courses, color_matrix, best_days, max_slots)
+    return best_days, color_matrix, lower
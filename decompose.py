@@ -0,0 +1,112 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from ordering import static_order
+from scheduler import apply_schedule, hard_schedule
+from solver import CP_SAT_TIME_LIMIT, CP_SAT_WORKERS, schedule_courses
+from utils import initialize_schedule, build_courses, occupancy_size
+
+
+def find_components(graph):
+    """
+    Split the conflict graph into connected components, each a list of course
+    indices, largest component first.
+    """
+    count, labels = connected_components(sparse.csr_matrix(graph), directed=False)
+    components = [np.flatnonzero(labels == label).tolist() for label in range(count)]
+    return sorted(components, key=len, reverse=True)
+
+
+def group_components(components, no_of_groups):
+    """
+    Pack components (largest first) into at most no_of_groups groups of
+    similar total size, so every worker gets about the same amount of work.
+    """
+    groups = [[] for _ in range(min(no_of_groups, len(components)))]
+    for component in components:
+        min(groups, key=len).extend(component)
+    return groups
+
+
+def schedule_component(task):
+    """
+    Schedule one group of components on its own, in its share of every lecture
+    hall. Runs in a worker process; returns {course code: (day, slot)}.
+    """
+    enrollment, codes, rosters, max_days, max_slots, ordering, backend, placement, kernelize, hall_share, \
+        cp_sat_time_limit, cp_sat_workers = task
+    graph, courses = build_courses(codes, rosters, enrollment)
+    schedule_courses(courses, graph, len(enrollment), max_days, max_slots, ordering, backend, placement,
+                     kernelize, hall_share, cp_sat_time_limit, cp_sat_workers)
+    return {
+        course.course_code: (course.color.day, course.color.slot)
+        for course in courses if course.color
+    }
+
+
+def decompose_schedule(courses, graph, enrollment, max_days, max_slots,
+                       ordering="static", backend="greedy", workers=None, placement="smallest",
+                       kernelize=False, cp_sat_time_limit=CP_SAT_TIME_LIMIT, cp_sat_workers=CP_SAT_WORKERS):
+    """
+    Schedule the connected components of the conflict graph independently in a
+    process pool with any backend, placement and kernelization (see
+    schedule_courses), then merge them into one color matrix.
+
+    Components share no students, so lecture halls are the only shared
+    resource: every group is given the share of each hall that its students
+    make up of all students, so the groups do not all fill the same early
+    colors. The merge allocates halls largest course first and sends the
+    courses that no longer fit in their slot (or did not fit in their share)
+    back through hard_schedule, into the colors already in use first.
+    Returns (color_matrix, number of unscheduled courses).
+    """
+    workers = workers or os.cpu_count() or 1
+    groups = group_components(find_components(graph), workers)
+    demand = [sum(courses[i].no_of_students for i in group) for group in groups]
+    tasks = []
+    for group, students in zip(groups, demand):
+        hall_share = students / sum(demand) if len(groups) > 1 and sum(demand) else 1.0
+        # Courses too large for the share of a slot's halls are left to the merge
+        seats = initialize_schedule(0, 1, 1, hall_share)[0][0].max_course_seats()
+        members = [i for i in group if courses[i].no_of_students <= seats]
+        tasks.append((
+            enrollment,
+            [courses[i].course_code for i in members],
+            [courses[i].student_ids for i in members],
+            max_days, max_slots, ordering, backend, placement, kernelize, hall_share,
+            cp_sat_time_limit, cp_sat_workers,
+        ))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(schedule_component, tasks))
+    else:
+        results = [schedule_component(task) for task in tasks]
+
+    course_index = {course.course_code: course for course in courses}
+    assignment = {
+        course_index[code]: color for result in results for code, color in result.items()
+    }
+
+    # Final hall allocation pass over the merged schedule
+    color_matrix = initialize_schedule(occupancy_size(courses, len(enrollment)), max_days, max_slots)
+    unplaced = apply_schedule(assignment, color_matrix, max_days, max_slots)
+    unplaced += [course for course in courses if course not in assignment]
+    print(f"Merged {len(groups)} component group(s); {len(unplaced)} course(s) rescheduled for lecture halls")
+
+    # A relaxed rule in a color already in use before a new color is opened
+    used = [
+        position for position in range(max_days * max_slots)
+        if color_matrix[position // max_slots][position % max_slots].courses
+    ]
+    unplaced = static_order(unplaced)
+    if used:
+        hard_schedule(unplaced, color_matrix, max_days, max_slots, ordering, used, placement)
+        unplaced = static_order([course for course in unplaced if not course.color])
+    no_of_unscheduled_courses = hard_schedule(
+        unplaced, color_matrix, max_days, max_slots, ordering, placement=placement
+    )
+    return color_matrix, no_of_unscheduled_courses
@@ -0,0 +1,178 @@
+import csv
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+
+from artifact_cache import load_graph, save_graph
+
+
+def load_pairs(path='data/pairs.json'):
+    """The (admn_no, sub_code) pairs of a pairs file, as a set; empty if there is none."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as data_file:
+        return {(pair["admn_no"], pair["sub_code"]) for pair in json.load(data_file)}
+
+
+def diff_pairs(old_pairs, new_pairs):
+    """(added, removed) student-course pairs between two sets of pairs."""
+    return new_pairs - old_pairs, old_pairs - new_pairs
+
+
+def patch_conflicts(codes, rosters, roll_numbers, conflicts, student_courses, added, removed):
+    """
+    Patch a stored conflict graph (see artifact_cache.load_graph) for added
+    and removed student-course pairs, touching only the courses of the
+    students whose course sets changed: their rosters and the rows and columns
+    of the sparse conflict matrix. student_courses gives every changed
+    student's courses after the change. New courses and students are appended
+    (the matrix is then grown); courses left without students stay, with no
+    conflicts.
+
+    Returns (codes, rosters, roll numbers, conflict matrix, codes of the
+    courses whose rosters changed, code pairs that share students now and did
+    not before).
+    """
+    codes, rosters, roll_numbers = list(codes), list(rosters), list(roll_numbers)
+    code_index = {code: i for i, code in enumerate(codes)}
+    student_index = {roll_no: i for i, roll_no in enumerate(roll_numbers)}
+
+    # Sorted, so the positions of new courses do not depend on the set's iteration order
+    added = sorted(added)
+    for _, code in added:
+        if code not in code_index:
+            code_index[code] = len(codes)
+            codes.append(code)
+            rosters.append(np.zeros(0, dtype=np.int32))
+    grow = len(codes) - conflicts.shape[0]
+    if grow:
+        conflicts = sparse.csr_matrix(
+            (conflicts.data, conflicts.indices, np.pad(conflicts.indptr, (0, grow), mode='edge')),
+            shape=(len(codes), len(codes)),
+        )
+
+    changes = defaultdict(lambda: (set(), set()))
+    for roll_no, code in added:
+        changes[roll_no][0].add(code)
+    for roll_no, code in removed:
+        if code in code_index:
+            changes[roll_no][1].add(code)
+
+    # Course sets of the changed students after and before the change
+    students = list(changes)
+    after = [set(student_courses.get(roll_no, ())) & code_index.keys() for roll_no in students]
+    before = [(now - changes[roll_no][0]) | changes[roll_no][1] for roll_no, now in zip(students, after)]
+    changed = sorted(set().union(*after, *before))
+    if not changed:
+        return codes, rosters, roll_numbers, conflicts, [], []
+    local = {code: k for k, code in enumerate(changed)}
+
+    def incidence(course_sets):
+        rows = [i for i, course_set in enumerate(course_sets) for _ in course_set]
+        cols = [local[code] for course_set in course_sets for code in course_set]
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(students), len(changed))
+        )
+
+    new_incidence, old_incidence = incidence(after), incidence(before)
+    delta = (new_incidence.T @ new_incidence - old_incidence.T @ old_incidence).toarray()
+    np.fill_diagonal(delta, 0)
+
+    # Only the rows and columns of the changed courses are read and written
+    index = np.array([code_index[code] for code in changed])
+    weights_before = conflicts[index][:, index].toarray()
+    rows, cols = np.nonzero(delta)
+    conflicts = conflicts + sparse.csr_matrix(
+        (delta[rows, cols].astype(conflicts.dtype), (index[rows], index[cols])), shape=conflicts.shape
+    )
+    conflicts.eliminate_zeros()
+    weights_after = weights_before + delta
+
+    gained = np.argwhere(np.triu((weights_before == 0) & (weights_after > 0), k=1))
+    new_edges = [(changed[a], changed[b]) for a, b in gained.tolist()]
+
+    # Rosters of the courses that gained or lost students
+    roster_changes = defaultdict(lambda: ([], []))
+    for roll_no, code in added:
+        if roll_no not in student_index:
+            student_index[roll_no] = len(roll_numbers)
+            roll_numbers.append(roll_no)
+        roster_changes[code][0].append(student_index[roll_no])
+    for roll_no, code in removed:
+        if code in code_index and roll_no in student_index:
+            roster_changes[code][1].append(student_index[roll_no])
+    for code, (joined, left) in roster_changes.items():
+        i = code_index[code]
+        rosters[i] = np.setdiff1d(np.union1d(rosters[i], joined), left).astype(np.int32)
+
+    return codes, rosters, roll_numbers, conflicts, list(roster_changes), new_edges
+
+
+def schedule_positions(filename="exam_schedule.csv"):
+    """Course code -> (day, slot) of a schedule written by main; empty if there is none."""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r', newline='') as f:
+        return {row['Course Code']: (row['Day'], row['Slot']) for row in csv.DictReader(f)}
+
+
+def clashing_pairs(edges, positions):
+    """The course code pairs among edges that are scheduled in the same (day, slot)."""
+    return [(a, b) for a, b in edges if a in positions and positions[a] == positions.get(b)]
+
+
+def data_order(codes, rosters, roll_numbers, conflicts, course_data):
+    """
+    Put a patched graph in the order build_weight_matrix gives it for
+    course_data (course code -> roll numbers): courses in key order, those
+    without students left out, and students numbered in order of first
+    appearance. Returns (codes, rosters, roll numbers, conflict matrix).
+    """
+    student_index = {}
+    for students in course_data.values():
+        for roll_no in students:
+            student_index.setdefault(roll_no, len(student_index))
+    remap = np.array([student_index.get(roll_no, -1) for roll_no in roll_numbers], dtype=np.int32)
+
+    code_index = {code: i for i, code in enumerate(codes)}
+    order = [
+        code_index[code] for code, students in course_data.items()
+        if students and code in code_index and len(rosters[code_index[code]])
+    ]
+    return (
+        [codes[i] for i in order],
+        [np.sort(remap[rosters[i]]) for i in order],
+        list(student_index),
+        conflicts[order][:, order],
+    )
+
+
+def update_cached_graph(old_key, new_key, old_pairs, new_pairs, student_courses,
+                        schedule_file="exam_schedule.csv", course_file="data/data_course.json"):
+    """
+    Patch the cached conflict graph of the old data into the one of the new
+    data, and store it under the new key, in the order a fresh build of
+    course_file would give it. Only the stored arrays are patched; no course
+    is built. Returns the course code pairs that the change puts in conflict
+    while sharing a slot of the last schedule, or None when the old graph is
+    not cached (the next run then builds it anew).
+    """
+    cached = load_graph(old_key)
+    if cached is None:
+        return None
+
+    added, removed = diff_pairs(old_pairs, new_pairs)
+    codes, rosters, roll_numbers, conflicts, touched, new_edges = patch_conflicts(
+        *cached, student_courses, added, removed
+    )
+    print(f"Conflict graph patched: {len(added)} pairs added, {len(removed)} removed, "
+          f"{len(touched)} courses changed, {len(new_edges)} new conflicts")
+
+    # Same course and student order as a build without the cache
+    with open(course_file, 'r') as data_file:
+        course_data = json.load(data_file)
+    save_graph(new_key, *data_order(codes, rosters, roll_numbers, conflicts, course_data))
+    return clashing_pairs(new_edges, schedule_positions(schedule_file))
@@ -0,0 +1,192 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from ortools.sat.python import cp_model
+
+from models import Color, HallTable, LectureHall
+from models.hall_table import SEAT_TYPES
+
+HALL_TIME_LIMIT = 2.0  # seconds per (day, slot)
+
+
+def slot_task(color):
+    """
+    The packing problem of one color as plain data: (day, slot, course sizes,
+    hall capacities, current allocation). The allocation lists (course,
+    hall, seat type, seats) by index and is the solver's hint.
+    """
+    table = color.hall_table
+    courses = [course for course in color.courses if course.no_of_students > 0]
+    current = [
+        (i, hall.cell[2], SEAT_TYPES.index(seat_type), seats)
+        for i, course in enumerate(courses)
+        for hall, seating_info in course.lecture_hall.items()
+        for seat_type, seats in seating_info.items()
+    ]
+    return (
+        color.day, color.slot,
+        [course.no_of_students for course in courses],
+        table.capacity.tolist(),
+        current,
+    )
+
+
+def first_fit_decreasing(sizes, capacity, halls):
+    """
+    Seat the courses, largest first, in the given halls only, with the
+    best-fit hall index of a one-slot table. Returns the allocation or None
+    when some course does not fit.
+    """
+    color = Color(0, 0)
+    color.hall_table = HallTable([str(h) for h in halls], [capacity[h] for h in halls], 1, 1)
+    for j, h in enumerate(halls):
+        LectureHall(str(h), *capacity[h], color, color.hall_table, j)
+    index = color.index_halls()
+
+    allocation = []
+    for i in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        selected = index.allocate(sizes[i])
+        if not selected:
+            return None
+        for hall, seating_info in selected.items():
+            j = hall.cell[2]
+            for seat_type, seats in seating_info.items():
+                kind = SEAT_TYPES.index(seat_type)
+                color.hall_table.set_seats(0, 0, j, kind, color.hall_table.seats(0, 0, j, kind) - seats)
+                allocation.append((i, halls[j], kind, seats))
+        index.update(selected)
+    return allocation
+
+
+def fewest_halls(sizes, capacity):
+    """
+    Allocation over the fewest of the largest halls that first-fit
+    decreasing can seat every course in.
+    """
+    order = sorted(range(len(capacity)), key=lambda h: sum(capacity[h]), reverse=True)
+    demand = sum(sizes)
+    seats = 0
+    for k, h in enumerate(order, 1):
+        seats += sum(capacity[h])
+        if seats >= demand:
+            allocation = first_fit_decreasing(sizes, capacity, order[:k])
+            if allocation is not None:
+                return allocation
+    return None
+
+
+def fewest_splits(sizes, capacity, allocation, time_limit):
+    """
+    Re-seat the courses with CP-SAT in the halls the allocation opens, using
+    as few seat blocks as possible; a course never sits in both the odd and
+    even seats of a hall. The allocation is the hint. Returns a better
+    allocation or None.
+    """
+    model = cp_model.CpModel()
+    halls = sorted({h for _, h, _, _ in allocation})
+    blocks = [(h, kind) for h in halls for kind in range(3) if capacity[h][kind] > 0]
+
+    seats = {}
+    used = {}
+    for i, size in enumerate(sizes):
+        for h, kind in blocks:
+            limit = min(size, capacity[h][kind])
+            seats[i, h, kind] = model.NewIntVar(0, limit, f"seats_{i}_{h}_{kind}")
+            used[i, h, kind] = model.NewBoolVar(f"used_{i}_{h}_{kind}")
+            model.Add(seats[i, h, kind] <= limit * used[i, h, kind])
+        model.Add(sum(seats[i, h, kind] for h, kind in blocks) == size)
+        for h in halls:
+            if (i, h, 0) in used and (i, h, 1) in used:
+                model.AddBoolOr([used[i, h, 0].Not(), used[i, h, 1].Not()])
+
+    for h, kind in blocks:
+        model.Add(sum(seats[i, h, kind] for i in range(len(sizes))) <= capacity[h][kind])
+    model.Minimize(sum(used.values()))
+
+    hinted = {(i, h, kind): taken for i, h, kind, taken in allocation}
+    for key, variable in seats.items():
+        model.AddHint(variable, hinted.get(key, 0))
+        model.AddHint(used[key], key in hinted)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE) or solver.ObjectiveValue() >= len(allocation):
+        return None
+
+    return [
+        (i, h, kind, solver.Value(variable))
+        for (i, h, kind), variable in seats.items()
+        if solver.Value(variable) > 0
+    ]
+
+
+def allocation_cost(allocation):
+    """(halls opened, seat blocks used) of an allocation."""
+    return len({h for _, h, _, _ in allocation}), len(allocation)
+
+
+def pack_slot(task, time_limit=HALL_TIME_LIMIT):
+    """
+    Seat the courses of one slot as a bin-packing problem: open as few halls
+    as possible (the largest ones first-fit decreasing can fill), then split
+    courses over as few seat blocks as possible with CP-SAT in those halls.
+    Returns (day, slot, allocation) like slot_task's, or None when the
+    current allocation is at least as good.
+    """
+    day, slot, sizes, capacity, current = task
+    allocation = fewest_halls(sizes, capacity)
+    if allocation is None:
+        return None
+    allocation = fewest_splits(sizes, capacity, allocation, time_limit) or allocation
+
+    if allocation_cost(allocation) >= allocation_cost(current):
+        return None
+    return day, slot, allocation
+
+
+def write_allocation(color, allocation):
+    """
+    Replace the lecture halls of the courses of a color with the given
+    allocation and rebuild the color's seat state and hall index.
+    """
+    table = color.hall_table
+    courses = [course for course in color.courses if course.no_of_students > 0]
+    halls = {hall.cell[2]: hall for hall in color.lecture_halls}
+
+    table.reset_slot(color.day, color.slot)
+    for course in courses:
+        course.lecture_hall = {}
+    for i, h, kind, seats in allocation:
+        hall = halls[h]
+        courses[i].lecture_hall.setdefault(hall, {})[SEAT_TYPES[kind]] = seats
+        table.set_seats(color.day, color.slot, h, kind, table.seats(color.day, color.slot, h, kind) - seats)
+    color.index_halls()
+
+
+def assign_lecture_halls(color_matrix, time_limit=HALL_TIME_LIMIT, workers=None):
+    """
+    Re-seat every used (day, slot) of a finished schedule, each slot packed
+    on its own so slots are solved in parallel. Slots where the solver finds
+    nothing better keep their greedy halls. Returns the number of halls
+    opened over all slots before and after.
+    """
+    colors = [color for row in color_matrix for color in row if color.courses]
+    tasks = [slot_task(color) for color in colors]
+    halls_before = sum(allocation_cost(task[4])[0] for task in tasks)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(pack_slot, tasks, [time_limit] * len(tasks)))
+    else:
+        results = [pack_slot(task, time_limit) for task in tasks]
+
+    halls_after = halls_before
+    for color, task, result in zip(colors, tasks, results):
+        if result:
+            write_allocation(color, result[2])
+            halls_after += allocation_cost(result[2])[0] - allocation_cost(task[4])[0]
+
+    print(f"Hall assignment: {halls_before} -> {halls_after} halls opened over {len(colors)} slots")
+    return halls_before, halls_after
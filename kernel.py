@@ -0,0 +1,34 @@
+from bounds import peel
+from scheduler import place_course
+
+
+def peel_courses(courses, no_of_colors):
+    """
+    Split the courses into the core of the conflict graph and the courses
+    with fewer adjacent courses than there are colors, which can always be
+    given a clash-free color afterwards. Returns (core, peeled) like peel.
+    """
+    return peel({course: course.adjacency_list for course in courses}, no_of_colors)
+
+
+def restore_peeled(peeled, color_matrix, max_days, max_slots, placement="smallest"):
+    """
+    Color the peeled courses last to first, each with the relaxation cascade
+    (placement as in hard_schedule) and hall fitting only. Returns the courses
+    that could not be placed (no hall left in any clash-free color).
+    """
+    unplaced = []
+    for course in reversed(peeled):
+        # Forbidden colors may date from an earlier color matrix of the core
+        course.reset_schedule()
+        for adj_course in course.adjacency_list:
+            if adj_course.color:
+                course.forbid(adj_course.color)
+        # Slots already in use first, so the peeled courses open no new ones if they can help it
+        color_order = sorted(
+            range(max_days * max_slots),
+            key=lambda p: (not color_matrix[p // max_slots][p % max_slots].courses, p),
+        )
+        if not place_course(course, color_matrix, max_days, max_slots, color_order, placement):
+            unplaced.append(course)
+    return unplaced
@@ -0,0 +1,233 @@
+import math
+import random
+import time
+import numpy as np
+from scipy import sparse
+
+from ordering import static_order
+from scheduler import apply_schedule, hard_schedule
+from utils import initialize_schedule, get_slot_capacity, occupancy_size
+
+LOCAL_SEARCH_TIME_LIMIT = 10.0  # seconds
+HALL_WEIGHT = 10  # Cost of every student above the seating capacity of a slot
+FINAL_TEMPERATURE = 0.1
+
+
+class ScheduleState:
+    """
+    Positions (flat day * max_slots + slot, -1 if unscheduled) of the courses
+    and the running totals that let a move be scored from the neighbourhoods
+    of the moved courses alone.
+
+    The cost is the sum over adjacent courses of their shared students for
+    every consecutive pair and every pair less than 4 colors apart (dis_3),
+    plus one per student and day beyond two exams, plus HALL_WEIGHT per
+    student above the seats of a slot.
+    """
+
+    def __init__(self, courses, graph, slot_capacity, no_of_students, max_days, max_slots):
+        conflicts = sparse.csr_matrix(graph)
+        self.indptr = conflicts.indptr
+        self.indices = conflicts.indices
+        self.weights = conflicts.data
+        self.max_slots = max_slots
+        # Occupancy rows (enrollment profiles when grouped) and the students each stands for
+        self.rosters = [course.occupancy_rows()[0] for course in courses]
+        if courses and courses[0].profile_weights is not None:
+            self.row_weights = courses[0].profile_weights.astype(np.int64)
+        else:
+            self.row_weights = np.ones(no_of_students, dtype=np.int64)
+        self.size = np.array([course.no_of_students for course in courses])
+        self.capacity = np.array(slot_capacity)
+        self.position = np.array([
+            course.color.day * max_slots + course.color.slot if course.color else -1
+            for course in courses
+        ])
+
+        placed = np.flatnonzero(self.position >= 0)
+        self.load = np.zeros(max_days * max_slots, dtype=int)
+        np.add.at(self.load, self.position[placed], self.size[placed])
+        self.exams_per_day = np.zeros((len(self.row_weights), max_days), dtype=np.int16)
+        for i in placed:
+            self.exams_per_day[self.rosters[i], self.position[i] // max_slots] += 1
+
+    def neighbours(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def pair_cost(self, i):
+        """Cost of the pairs formed by course i and its scheduled adjacent courses."""
+        position = self.position[i]
+        other = self.position[self.neighbours(i)]
+        weights = self.weights[self.indptr[i]:self.indptr[i + 1]]
+        distance = np.abs(other - position)
+        same_day = other // self.max_slots == position // self.max_slots
+        cost = weights * ((distance < 4).astype(int) + ((distance == 1) & same_day))
+        return int(cost[other >= 0].sum())
+
+    def day_cost(self, students, days):
+        """Exams beyond two a day for the given students and days."""
+        counts = self.exams_per_day[np.ix_(students, days)].astype(int)
+        return int(np.maximum(counts - 2, 0).sum(axis=1) @ self.row_weights[students])
+
+    def hall_cost(self, colors):
+        return HALL_WEIGHT * int(np.maximum(self.load[colors] - self.capacity[colors], 0).sum())
+
+    def total_cost(self):
+        placed = np.flatnonzero(self.position >= 0)
+        pairs = sum(self.pair_cost(i) for i in placed) // 2
+        days = int(np.maximum(self.exams_per_day.astype(int) - 2, 0).sum(axis=1) @ self.row_weights)
+        return pairs + days + self.hall_cost(np.arange(len(self.load)))
+
+    def relocate(self, members, targets):
+        """
+        Move courses to new positions and return the change in cost. Only the
+        moved courses' pairs, students and colors are looked at; pairs inside
+        the moved set of a Kempe swap keep their distance, so counting them
+        from both ends does not change the difference.
+        """
+        members = np.asarray(members)
+        targets = np.asarray(targets)
+        old = self.position[members]
+        colors = np.unique(np.concatenate([old, targets]))
+        days = np.unique(colors // self.max_slots)
+        students = np.unique(np.concatenate([self.rosters[i] for i in members]))
+
+        before = sum(self.pair_cost(i) for i in members)
+        before += self.day_cost(students, days) + self.hall_cost(colors)
+
+        for i, source, target in zip(members.tolist(), old.tolist(), targets.tolist()):
+            self.exams_per_day[self.rosters[i], source // self.max_slots] -= 1
+            self.exams_per_day[self.rosters[i], target // self.max_slots] += 1
+            self.load[source] -= self.size[i]
+            self.load[target] += self.size[i]
+            self.position[i] = target
+
+        after = sum(self.pair_cost(i) for i in members)
+        after += self.day_cost(students, days) + self.hall_cost(colors)
+        return after - before
+
+    def kempe_chain(self, i, target):
+        """
+        Courses reachable from course i through adjacent courses sitting in
+        i's color or the target color; swapping their two colors keeps the
+        schedule clash-free.
+        """
+        pair = (self.position[i], target)
+        chain = {i}
+        stack = [i]
+        while stack:
+            for j in self.neighbours(stack.pop()).tolist():
+                if j not in chain and self.position[j] in pair:
+                    chain.add(j)
+                    stack.append(j)
+        return list(chain)
+
+
+def improve_schedule(courses, graph, color_matrix, no_of_students, max_days, max_slots,
+                     ordering="static", time_limit=LOCAL_SEARCH_TIME_LIMIT,
+                     max_iterations=None, seed=None, placement="smallest"):
+    """
+    Improve a finished schedule by simulated annealing over single-course
+    moves and Kempe-chain swaps between the colors the schedule already uses,
+    so the number of slots never grows. courses must follow graph's order.
+
+    Runs until time_limit seconds or max_iterations, at least one of which
+    must be set (a ValueError otherwise). The best schedule found
+    is written into a fresh color matrix, lecture halls allocated largest
+    course first, and the courses that no longer fit are placed again with
+    the given placement. The input schedule is kept when the result uses more
+    slots or leaves more courses unscheduled. Returns (color_matrix, number of
+    unscheduled courses, history), history listing (seconds, iteration, cost)
+    at every improvement.
+    """
+    if not time_limit and not max_iterations:
+        raise ValueError("The local search needs a time limit or an iteration limit to stop.")
+    rng = random.Random(seed)
+    empty_matrix = initialize_schedule(0, max_days, max_slots)
+    slot_capacity = get_slot_capacity(empty_matrix, max_days, max_slots)
+    state = ScheduleState(courses, graph, slot_capacity, no_of_students, max_days, max_slots)
+
+    placed = np.flatnonzero(state.position >= 0).tolist()
+    used_colors = sorted(set(state.position[placed].tolist()))
+    cost = state.total_cost()
+    best_cost, best_position = cost, state.position.copy()
+    history = [(0.0, 0, cost)]
+
+    start_temperature = max(float(np.median(state.weights)) if len(state.weights) else 1.0, 1.0)
+    start = time.time()
+    iteration = 0
+    while len(used_colors) > 1 and placed:
+        elapsed = time.time() - start
+        progress = max(
+            elapsed / time_limit if time_limit else 0.0,
+            iteration / max_iterations if max_iterations else 0.0,
+        )
+        if progress >= 1.0:
+            break
+        temperature = start_temperature * (FINAL_TEMPERATURE / start_temperature) ** progress
+        iteration += 1
+
+        i = rng.choice(placed)
+        target = rng.choice(used_colors)
+        if target == state.position[i]:
+            continue
+
+        members = state.kempe_chain(i, target)
+        source = state.position[i]
+        old = state.position[members].copy()
+        targets = np.where(old == source, target, source)
+        delta = state.relocate(members, targets)
+
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            cost += delta
+            if cost < best_cost:
+                best_cost, best_position = cost, state.position.copy()
+                history.append((round(elapsed, 3), iteration, cost))
+        else:
+            state.relocate(members, old)
+
+    print(f"Local search: cost {history[0][2]} -> {best_cost} in {iteration} iterations "
+          f"({time.time() - start:.1f}s)")
+    # Best cost at the end of every second that improved it
+    report = {int(seconds): (seconds, at_iteration, at_cost) for seconds, at_iteration, at_cost in history[1:]}
+    for seconds, at_iteration, at_cost in report.values():
+        print(f"  {seconds:>8.3f}s  iteration {at_iteration:<8} cost {at_cost}")
+
+    assignment = {
+        courses[i]: divmod(int(best_position[i]), max_slots) for i in placed
+    }
+    unscheduled = [course for course in courses if not course.color]
+    previous = {course: saved_schedule(course) for course in courses}
+    for course in courses:
+        course.reset_schedule()
+
+    improved_matrix = initialize_schedule(occupancy_size(courses, no_of_students), max_days, max_slots)
+    unplaced = apply_schedule(assignment, improved_matrix, max_days, max_slots)
+    no_of_unscheduled_courses = hard_schedule(
+        static_order(unplaced + unscheduled), improved_matrix, max_days, max_slots, ordering,
+        placement=placement
+    )
+    if (no_of_unscheduled_courses > len(unscheduled)
+            or used_slots(improved_matrix) > used_slots(color_matrix)):
+        print("Local search: the rebuilt schedule is worse, keeping the input schedule")
+        for course, saved in previous.items():
+            restore_schedule(course, saved)
+        return color_matrix, len(unscheduled), history[:1]
+    return improved_matrix, no_of_unscheduled_courses, history
+
+
+def used_slots(color_matrix):
+    """Number of colors holding at least one course."""
+    return sum(1 for day in color_matrix for color in day if color.courses)
+
+
+def saved_schedule(course):
+    """The schedule state of a course, for restore_schedule."""
+    return (course.color, course.flag, dict(getattr(course, "lecture_hall", {})),
+            course.forbidden_mask, course.forbidden_consecutive, course.forbidden_spacing)
+
+
+def restore_schedule(course, saved):
+    """Put back the schedule state saved by saved_schedule."""
+    (course.color, course.flag, course.lecture_hall, course.forbidden_mask,
+     course.forbidden_consecutive, course.forbidden_spacing) = saved
@@ -1,19 +1,48 @@
-import sys
+import argparse
 from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
 from utils import (
     build_weight_matrix,
     calculate_degree,
-    initialize_colors,
+    compute_bounds,
+    write_bounds_summary,
     initialize_students,
-    initialize_lecture_halls,
     output_to_csv,
     convert_lecture_hall_to_csv,
     convert_seating_plan_to_csv
 )
-from scheduler import hard_schedule
+from solver import BACKENDS, CP_SAT_TIME_LIMIT, CP_SAT_WORKERS, schedule_courses
+from scheduler import PLACEMENTS, SCHEDULERS
+from decompose import decompose_schedule
+from multistart import multistart_schedule
+from local_search import improve_schedule
+from day_search import search_min_days
+from hall_assignment import assign_lecture_halls
+from repair import PREVIOUS_SCHEDULE, load_previous_schedule, moved_courses, repair_schedule
+from artifact_cache import input_hash, load_bounds
+from models import Enrollment
 import os
 
-def main(max_days, max_slots):
+def main(max_days, max_slots, ordering="static", backend="greedy", components=False, workers=None,
+         starts=1, seed=None, improve=0, auto_days=False, pack_halls=False, all_cliques=False,
+         bounds=True, cache=True, repair=None, placement="smallest", kernelize=False,
+         cp_sat_time_limit=CP_SAT_TIME_LIMIT, cp_sat_workers=CP_SAT_WORKERS):
+    if ordering not in SCHEDULERS:
+        raise ValueError(f"Unknown ordering '{ordering}'. Choose one of: {', '.join(SCHEDULERS)}.")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of: {', '.join(BACKENDS)}.")
+    if placement not in PLACEMENTS:
+        raise ValueError(f"Unknown placement '{placement}'. Choose one of: {', '.join(PLACEMENTS)}.")
+    if cp_sat_time_limit <= 0 or cp_sat_workers < 1:
+        raise ValueError("The cp_sat backend needs a positive time limit and at least one worker.")
+    # Only one scheduling mode runs, so options another mode would drop are refused
+    if repair and (starts > 1 or components or backend != "greedy" or kernelize):
+        raise ValueError("A repair run places courses with the greedy cascade only; it cannot be "
+                         "combined with multiple starts, components, another backend or kernelize.")
+    if starts > 1 and (components or backend != "greedy" or kernelize):
+        raise ValueError("Multiple starts run the greedy backend on the whole graph; "
+                         "they cannot be combined with components, another backend or kernelize.")
+
     os.makedirs("bounds", exist_ok=True)
     summary_file = "bounds/scheduling_summary.txt"
 
@@ -21,25 +50,109 @@ def main(max_days, max_slots):
         f.write("Scheduling Summary\n")
         f.write("===================\n")
 
-    graph, course_list, course_index = build_weight_matrix()
+    # Graph and bounds are reused from the artifact cache while the course data is unchanged
+    cache_key = input_hash() if cache else None
+    enrollment = Enrollment()
+    graph, course_list, course_index = build_weight_matrix(enrollment, cache_key)
 
     # Calculate degrees for prioritizing course scheduling
     calculate_degree(graph, course_list)
 
-    # Sort courses based on degree and maximum adjacency
-    sorted_courses = sorted(
-        course_list,
-        key=lambda course: (course.degree, course.max_adjacency),
-        reverse=True
-    )
+    # The bounds do not feed the schedule, so a worker process computes them meanwhile
+    bounds_future = None
+    cached_bounds = load_bounds(cache_key, all_cliques) if bounds and cache_key else None
+    if cached_bounds:
+        bounds_future = Future()
+        bounds_future.set_result(cached_bounds)
+    elif bounds:
+        bounds_pool = ProcessPoolExecutor(max_workers=1)
+        bounds_future = bounds_pool.submit(
+            compute_bounds, graph, [course.course_code for course in course_list], all_cliques, cache_key
+        )
+        bounds_pool.shutdown(wait=False)
 
-    # Initialize colors (time slots) and lecture halls
-    color_matrix = initialize_colors(max_days, max_slots)
     initialize_students(course_index, max_days, max_slots)
-    initialize_lecture_halls(color_matrix,max_days, max_slots)
 
-    # Perform scheduling
-    no_of_unscheduled_courses = hard_schedule(sorted_courses, color_matrix, max_days, max_slots)
+    rescheduled = (starts > 1 or components or backend != "greedy" or bool(repair)
+                   or placement != "smallest" or kernelize)
+    if auto_days:
+        clique_number, hoffman_bound = 0, 0
+        if bounds_future:
+            # The search starts from the lower bounds, so they are needed now
+            clique_number, exact, hoffman_bound = bounds_future.result()
+            write_bounds_summary((clique_number, exact, hoffman_bound), summary_file)
+            bounds_future = None
+
+        # Smallest calendar the greedy cascade fits; max_days is only the first guess
+        max_days, color_matrix, lower_days = search_min_days(
+            course_list, graph, len(enrollment), max_days, max_slots, clique_number, hoffman_bound, ordering
+        )
+        no_of_unscheduled_courses = 0
+        with open(summary_file, "a") as f:
+            f.write(f"Minimum days: {max_days} (lower bound: {lower_days})\n")
+        if rescheduled:
+            for course in course_list:
+                course.reset_schedule()
+
+    # Perform scheduling, courses ordered by degree and maximum adjacency
+    previously_scheduled = load_previous_schedule(course_index, repair) if repair else 0
+    if repair and not previously_scheduled:
+        print(f"No course of the current data is in {repair}; scheduling from scratch")
+    if previously_scheduled:
+        # Keep the published slots that are still feasible, move only the rest
+        color_matrix, no_of_unscheduled_courses, moved, evicted = repair_schedule(
+            course_list, len(enrollment), max_days, max_slots, ordering, placement
+        )
+        if no_of_unscheduled_courses:
+            # Fall back to a fresh schedule, every course free to move, when it places more
+            print(f"Repair left {no_of_unscheduled_courses} course(s) unscheduled; trying a fresh schedule")
+            for course in course_list:
+                course.reset_schedule()
+            fresh_matrix, fresh_unscheduled = schedule_courses(
+                course_list, graph, len(enrollment), max_days, max_slots, ordering, backend, placement
+            )
+            if fresh_unscheduled < no_of_unscheduled_courses:
+                color_matrix, no_of_unscheduled_courses = fresh_matrix, fresh_unscheduled
+                moved = evicted = moved_courses(course_list, max_days, max_slots)
+            else:
+                # The repair is deterministic, run it again to restore its schedule
+                for course in course_list:
+                    course.reset_schedule()
+                color_matrix, no_of_unscheduled_courses, moved, evicted = repair_schedule(
+                    course_list, len(enrollment), max_days, max_slots, ordering, placement
+                )
+        with open(summary_file, "a") as f:
+            f.write(f"Repair: {len(moved)} of {previously_scheduled} previously scheduled courses moved, "
+                    f"{len(evicted)} of them evicted to make room\n")
+    elif starts > 1:
+        color_matrix, no_of_unscheduled_courses = multistart_schedule(
+            course_list, graph, enrollment, max_days, max_slots, ordering, starts, seed, workers, placement
+        )
+    elif components:
+        color_matrix, no_of_unscheduled_courses = decompose_schedule(
+            course_list, graph, enrollment, max_days, max_slots, ordering, backend, workers, placement,
+            kernelize, cp_sat_time_limit, cp_sat_workers
+        )
+    elif rescheduled or not auto_days:
+        color_matrix, no_of_unscheduled_courses = schedule_courses(
+            course_list, graph, len(enrollment), max_days, max_slots, ordering, backend, placement, kernelize,
+            cp_sat_time_limit=cp_sat_time_limit, cp_sat_workers=cp_sat_workers
+        )
+
+    if improve > 0:
+        # Local search over the finished schedule for the given number of seconds
+        color_matrix, no_of_unscheduled_courses, history = improve_schedule(
+            course_list, graph, color_matrix, len(enrollment), max_days, max_slots,
+            ordering, time_limit=improve, seed=seed, placement=placement
+        )
+        with open(summary_file, "a") as f:
+            f.write(f"Local search cost: {history[0][2]} -> {history[-1][2]}\n")
+
+    if pack_halls:
+        # Re-seat every slot now that the slots are fixed
+        halls_before, halls_after = assign_lecture_halls(color_matrix, workers=workers)
+        with open(summary_file, "a") as f:
+            f.write(f"Halls opened over all slots: {halls_before} -> {halls_after}\n")
 
     if no_of_unscheduled_courses != 0:
         print(f"Unable to schedule {no_of_unscheduled_courses} courses. Consider increasing the number of days or slots.")
@@ -79,6 +192,9 @@ def main(max_days, max_slots):
                         'Slot': slot + 1
                     })
 
+    if bounds_future:
+        write_bounds_summary(bounds_future.result(), summary_file)
+
     with open("bounds/scheduling_summary.txt", mode='a') as f:
         f.write(f"Total no. of slots: {total_no_of_slots}\n")
 
@@ -122,8 +238,16 @@ def main(max_days, max_slots):
                 max_LH = max(max_LH, len(LH_list))
             schedule_lecture_hall[day][slot].sort(key=lambda x: x["Course Code"])
 
+    # Seat utilization from the running hall counters of the used slots
+    used_slots = [color for row in color_matrix for color in row if color.courses]
+    hall_table = color_matrix[0][0].hall_table
+    utilization = hall_table.utilization() if hall_table is not None else None
+
     with open("bounds/scheduling_summary.txt", mode='a') as f:
         f.write(f"Max lecture halls used at any slot: {max_LH}\n")
+        if used_slots and utilization is not None:
+            average = sum(utilization[color.day, color.slot] for color in used_slots) / len(used_slots)
+            f.write(f"Average seat utilization of used slots: {average:.1%}\n")
     
     # Grouping schedule by day and slot, sorted by course code
     schedule_seating_plan = defaultdict(lambda: defaultdict(list))
@@ -207,6 +331,41 @@ def main(max_days, max_slots):
         print("All courses have been scheduled successfully.")
 
 if __name__ == "__main__":
-    days = int(sys.argv[1]) if len(sys.argv) > 0 else 8
-    slots = int(sys.argv[2]) if len(sys.argv) > 0 else 2
-    main(days, slots)
+    parser = argparse.ArgumentParser(description="Generate the exam schedule.")
+    parser.add_argument("days", type=int, nargs="?", default=8)
+    parser.add_argument("slots", type=int, nargs="?", default=2)
+    parser.add_argument("ordering", nargs="?", default="static", choices=SCHEDULERS)
+    parser.add_argument("backend", nargs="?", default="greedy", choices=BACKENDS)
+    parser.add_argument("--components", action="store_true", help="solve connected components in parallel")
+    parser.add_argument("--starts", type=int, default=1, help="number of randomized greedy starts")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the randomized starts")
+    parser.add_argument("--improve", type=float, default=0,
+                        help="seconds of local search after scheduling (default: off)")
+    parser.add_argument("--auto-days", action="store_true",
+                        help="search for the fewest days that fit, starting from the lower bounds")
+    parser.add_argument("--pack-halls", action="store_true",
+                        help="re-seat every slot to open fewer lecture halls once slots are fixed")
+    parser.add_argument("--all-cliques", action="store_true",
+                        help="enumerate every maximal clique into bounds/clique.csv (exponential)")
+    parser.add_argument("--skip-bounds", action="store_true",
+                        help="do not compute the clique number and Hoffman bound")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="rebuild the conflict graph and bounds instead of reusing cached ones")
+    parser.add_argument("--repair", nargs="?", const=PREVIOUS_SCHEDULE, default=None,
+                        metavar="SCHEDULE",
+                        help="start from the schedule of an earlier run (default: exam_schedule.csv) "
+                             "and move only conflicted courses")
+    parser.add_argument("--placement", choices=PLACEMENTS, default="smallest",
+                        help="color taken once a rule is relaxed: the smallest, or the least violating one")
+    parser.add_argument("--kernelize", action="store_true",
+                        help="schedule the core of the conflict graph first and fit low-degree courses in after")
+    parser.add_argument("--cp-sat-time-limit", type=float, default=CP_SAT_TIME_LIMIT,
+                        help=f"seconds the cp_sat backend may search (default: {CP_SAT_TIME_LIMIT:g})")
+    parser.add_argument("--cp-sat-workers", type=int, default=CP_SAT_WORKERS,
+                        help=f"search workers of the cp_sat backend (default: {CP_SAT_WORKERS})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    main(args.days, args.slots, args.ordering, args.backend, args.components, args.workers,
+         args.starts, args.seed, args.improve, args.auto_days, args.pack_halls, args.all_cliques,
+         not args.skip_bounds, not args.no_cache, args.repair, args.placement, args.kernelize,
+         args.cp_sat_time_limit, args.cp_sat_workers)
@@ -2,5 +2,9 @@ from .course import Course
 from .student import Student
 from .color import Color
 from .lecture_hall import LectureHall
+from .hall_table import HallTable
+from .hall_index import HallIndex
+from .enrollment import Enrollment, Roster
+from .occupancy import ExamOccupancy
 
-__all__ = ['Course', 'Student', 'Color', 'LectureHall']
+__all__ = ['Course', 'Student', 'Color', 'LectureHall', 'HallTable', 'HallIndex', 'Enrollment', 'Roster', 'ExamOccupancy']
@@ -1,5 +1,13 @@
-from typing import List
+from typing import List, Optional
 from models.lecture_hall import LectureHall
+from models.hall_index import HallIndex
+from models.hall_table import HallTable
+from models.occupancy import ExamOccupancy
+
+
+def _bit_span(first: int, last: int) -> int:
+    """Bitmask with bits first..last (inclusive) set."""
+    return ((1 << (last - first + 1)) - 1) << first
 
 
 class Color:
@@ -8,19 +16,67 @@ class Color:
         self.slot = slot
         self.courses = []
         self.lecture_halls: List[LectureHall] = []
+        self.hall_index: Optional[HallIndex] = None
+        # Seat table shared by the halls of the whole schedule, if any
+        self.hall_table: Optional[HallTable] = None
+        self.occupancy: Optional[ExamOccupancy] = None
+        # Rule engine shared by the colors of the schedule (constraints.Constraints), built on first use
+        self.constraints = None
+        # Bitmasks over the flattened days x slots grid, set by set_grid()
+        self.mask = 0
+        self.consecutive_window = 0
+        self.spacing_window = 0
+
+    def set_grid(self, max_days: int, max_slots: int):
+        """Precomputes this color's bit and the bits of the colors too close to it."""
+        position = self.day * max_slots + self.slot
+        first_of_day = self.day * max_slots
+        self.mask = 1 << position
+        # Same day, one slot either side (no_consecutive_exams)
+        self.consecutive_window = _bit_span(
+            max(position - 1, first_of_day),
+            min(position + 1, first_of_day + max_slots - 1),
+        )
+        # Less than 4 colors apart (minimum_gap)
+        self.spacing_window = _bit_span(
+            max(position - 3, 0),
+            min(position + 3, max_days * max_slots - 1),
+        )
+
+    def index_halls(self) -> HallIndex:
+        """(Re)builds the free-seat index of this color's lecture halls, in list order."""
+        self.hall_index = HallIndex(self.lecture_halls)
+        return self.hall_index
 
     def capacity_available(self) -> int:
         """Returns maximum number of students that can be accommodated."""
+        if self.hall_table is not None:
+            return self.hall_table.total(self.day, self.slot)
         capacity = 0
         for hall in self.lecture_halls:
             capacity += hall.availability()['total']
         return capacity
 
+    def max_course_seats(self) -> int:
+        """Most students one course can still be seated with in this color."""
+        if self.hall_table is not None:
+            return self.hall_table.max_course_seats(self.day, self.slot)
+        return sum(
+            max(hall.odd_capacity, hall.even_capacity) + hall.single_capacity
+            for hall in self.lecture_halls
+        )
+
+    def usable_halls(self) -> int:
+        """Number of lecture halls with a free seat."""
+        if self.hall_table is not None:
+            return int(self.hall_table.usable[self.day, self.slot])
+        return len(self.lecture_hall_list())
+
     def lecture_hall_list(self) -> List[LectureHall]:
         """List of lecture halls with available capacity."""
         available_halls = []
         for hall in self.lecture_halls:
-            if hall.availability()['total'] > 0:
+            if hall.has_capacity():
                 available_halls.append(hall)
         return available_halls
 
@@ -1,6 +1,7 @@
-from typing import List, Optional, Set, Dict
+from typing import List, Optional, Set, Dict, Union
 from models.color import Color
 from models.lecture_hall import LectureHall
+from models.enrollment import Roster
 
 
 class Course:
@@ -9,13 +10,19 @@ class Course:
         self,
         id: int,
         code: str,
-        student_list: Set[str],
+        student_list: Union[Set[str], Roster],
         old_day: int = 0,
         old_slot: int = 0,
     ):
         self.id = id
         self.course_code = code
         self.student_list = student_list
+        # Dense int ids of the roster, None when built from raw roll numbers
+        self.student_ids = student_list.ids if isinstance(student_list, Roster) else None
+        # Enrollment profiles of the roster and the students in every profile, when
+        # grouped (see Enrollment.group_profiles); the exam occupancy is then kept per profile
+        self.profile_ids = None
+        self.profile_weights = None
         self.no_of_students = len(student_list)
         self.degree = 0
         self.flag = True
@@ -25,6 +32,11 @@ class Course:
         self.lecture_halls: Dict[LectureHall, str] = {}
         self.old_day = old_day
         self.old_slot = old_slot
+        # Colors ruled out by already colored adjacent courses, as bitmasks
+        # over the days x slots grid (see Color.set_grid)
+        self.forbidden_mask = 0
+        self.forbidden_consecutive = 0
+        self.forbidden_spacing = 0
 
     def ordered_adjacency_list(self) -> List['Course']:
         return sorted(
@@ -33,11 +45,40 @@ class Course:
             reverse=True,
         )
 
+    def occupancy_rows(self):
+        """
+        Rows of the exam occupancy index this course's students are counted
+        in, and how many students each row stands for (None: one each).
+        """
+        if self.profile_ids is not None:
+            return self.profile_ids, self.profile_weights[self.profile_ids]
+        return self.student_ids, None
+
     def assign_color(self, color: Color):
         self.color = color
         color.courses.append(self)
+        rows, _ = self.occupancy_rows()
+        if color.occupancy is not None and rows is not None:
+            color.occupancy.add(rows, color.day, color.slot)
+        for adj_course in self.adjacency_list:
+            adj_course.forbid(color)
         print(f"Assigned: {self.course_code} to Day {color.day}, Slot {color.slot}")
 
+    def reset_schedule(self):
+        """Clears the color, lecture halls and forbidden colors of this course."""
+        self.color = None
+        self.flag = True
+        self.lecture_hall = {}
+        self.forbidden_mask = 0
+        self.forbidden_consecutive = 0
+        self.forbidden_spacing = 0
+
+    def forbid(self, color: Color):
+        """Removes a color taken by an adjacent course from this course's domain."""
+        self.forbidden_mask |= color.mask
+        self.forbidden_consecutive |= color.consecutive_window
+        self.forbidden_spacing |= color.spacing_window
+
     def get_hall_list(self) -> str:
         res = ""
         for hall, info in self.lecture_halls.items():
@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+
+class Enrollment:
+    """Interns student roll numbers to dense integer ids."""
+
+    def __init__(self):
+        self.roll_numbers: List[str] = []
+        self.student_index: Dict[str, int] = {}
+
+    def intern(self, roll_no: str) -> int:
+        """Returns the id of a roll number, allocating the next one if new."""
+        student_id = self.student_index.get(roll_no)
+        if student_id is None:
+            student_id = len(self.roll_numbers)
+            self.student_index[roll_no] = student_id
+            self.roll_numbers.append(roll_no)
+        return student_id
+
+    def roster(self, roll_numbers: Iterable[str]) -> 'Roster':
+        """Builds the roster of a course from its roll numbers."""
+        ids = np.fromiter((self.intern(roll) for roll in roll_numbers), dtype=np.int32)
+        return Roster(self, np.unique(ids))
+
+    def group_profiles(self, rosters: Sequence[np.ndarray]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """Groups the students by identical course sets into enrollment profiles.
+
+        rosters are the student ids of every course. Students of one profile
+        sit every exam together, so any per-student check gives the same
+        answer for all of them. Returns the profile ids of every roster and
+        the number of students in every profile.
+        """
+        course_sets: Dict[int, List[int]] = {}
+        for i, roster in enumerate(rosters):
+            for student_id in roster.tolist():
+                course_sets.setdefault(student_id, []).append(i)
+
+        profile_index: Dict[Tuple[int, ...], int] = {}
+        student_profile = np.zeros(len(self), dtype=np.int32)
+        for student_id, course_set in course_sets.items():
+            student_profile[student_id] = profile_index.setdefault(tuple(course_set), len(profile_index))
+
+        weights = np.bincount(
+            student_profile[list(course_sets)], minlength=len(profile_index)
+        ) if course_sets else np.zeros(0, dtype=np.int64)
+        profile_ids = [np.unique(student_profile[roster]) for roster in rosters]
+        return profile_ids, weights
+
+    def __len__(self):
+        return len(self.roll_numbers)
+
+
+class Roster:
+    """Sorted, duplicate-free student ids of a course.
+
+    Behaves like a set of roll numbers, so code written against the raw
+    student lists keeps working, while membership is a hash lookup and
+    intersections run on the int arrays.
+    """
+
+    __slots__ = ('enrollment', 'ids', '_id_set')
+
+    def __init__(self, enrollment: Enrollment, ids: np.ndarray):
+        self.enrollment = enrollment
+        self.ids = ids
+        self._id_set = frozenset(ids.tolist())
+
+    def __contains__(self, student: Union[str, int]) -> bool:
+        if isinstance(student, str):
+            student = self.enrollment.student_index.get(student)
+        return student in self._id_set
+
+    def __iter__(self) -> Iterator[str]:
+        roll_numbers = self.enrollment.roll_numbers
+        for student_id in self.ids.tolist():
+            yield roll_numbers[student_id]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __and__(self, other: 'Roster') -> 'Roster':
+        common = np.intersect1d(self.ids, other.ids, assume_unique=True)
+        return Roster(self.enrollment, common)
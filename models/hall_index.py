@@ -0,0 +1,95 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+from models.hall_table import SEAT_TYPES
+from models.lecture_hall import LectureHall
+
+# Seat type (index) a course may not use in a hall where it already sits in the given one
+EXCLUSIVE = (1, 0, None)
+
+
+def free_seats(hall: LectureHall, seat_type: str) -> int:
+    """Seats of the given type still free in the hall."""
+    if seat_type == 'o':
+        return hall.odd_capacity if hall.odd else 0
+    if seat_type == 'e':
+        return hall.even_capacity if hall.even else 0
+    return hall.single_capacity if hall.single else 0
+
+
+class HallIndex:
+    """Free seats of the lecture halls of one color, sorted for best-fit queries.
+
+    Entries are (free seats, hall rank, seat type index); the rank is the
+    hall's position in the color's hall list, and with the seat type in
+    odd, even, single order it breaks ties between equal blocks.
+    """
+
+    def __init__(self, halls: Iterable[LectureHall]):
+        self.halls: List[LectureHall] = list(dict.fromkeys(halls))
+        self.rank: Dict[LectureHall, int] = {hall: i for i, hall in enumerate(self.halls)}
+        self.free: Dict[Tuple[int, int], int] = {}
+        for i, hall in enumerate(self.halls):
+            for kind, seat_type in enumerate(SEAT_TYPES):
+                self.free[(i, kind)] = free_seats(hall, seat_type)
+        self.entries: List[Tuple[int, int, int]] = sorted(
+            (seats, i, kind) for (i, kind), seats in self.free.items() if seats > 0
+        )
+
+    def allocate(self, students: int) -> Dict[LectureHall, Dict[str, int]]:
+        """
+        Seats for the given number of students, as {hall: {seat type: seats}}.
+
+        The smallest block that seats everyone left is used when there is one
+        (best fit); otherwise the largest block is filled and the search goes
+        on for the rest (first-fit decreasing). A course never sits in both
+        the odd and even seats of a hall. Returns {} when the students do not
+        fit. The index is not changed until update() is called.
+        """
+        selected = {}
+        excluded = set()
+        remaining = students
+
+        while remaining > 0:
+            i = self._first_usable(bisect_left(self.entries, (remaining,)), excluded)
+            if i < len(self.entries):
+                seats = remaining
+                _, rank, kind = self.entries[i]
+            else:
+                # Largest usable block, the first one among equal blocks
+                i = len(self.entries) - 1
+                while i >= 0 and self.entries[i][1:] in excluded:
+                    i -= 1
+                if i < 0:
+                    return {}
+                i = self._first_usable(bisect_left(self.entries, (self.entries[i][0],)), excluded)
+                seats, rank, kind = self.entries[i]
+
+            selected.setdefault(self.halls[rank], {})[SEAT_TYPES[kind]] = seats
+            excluded.add((rank, kind))
+            if EXCLUSIVE[kind] is not None:
+                excluded.add((rank, EXCLUSIVE[kind]))
+            remaining -= seats
+
+        return selected
+
+    def _first_usable(self, i: int, excluded) -> int:
+        """Index of the first entry from i on that is not excluded."""
+        while i < len(self.entries) and self.entries[i][1:] in excluded:
+            i += 1
+        return i
+
+    def update(self, halls: Iterable[LectureHall]):
+        """Re-reads the free seats of the given halls after an allocation."""
+        for hall in halls:
+            rank = self.rank[hall]
+            for kind, seat_type in enumerate(SEAT_TYPES):
+                old = self.free[(rank, kind)]
+                new = free_seats(hall, seat_type)
+                if old == new:
+                    continue
+                if old > 0:
+                    del self.entries[bisect_left(self.entries, (old, rank, kind))]
+                if new > 0:
+                    insort(self.entries, (new, rank, kind))
+                self.free[(rank, kind)] = new
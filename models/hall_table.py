@@ -0,0 +1,87 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Seat types in the order of the last axis of the table
+SEAT_TYPES = ('o', 'e', 's')
+
+
+class HallTable:
+    """Free odd, even and single seats of every lecture hall in every day and slot.
+
+    free has shape (days, slots, halls, 3). set_seats keeps running counters
+    for every (day, slot) current, so capacity queries are O(1):
+    totals (free seats), type_totals (free seats per seat type), usable
+    (halls with a free seat) and seatable (the most students one course can
+    be given: it never sits in both the odd and even seats of a hall).
+    """
+
+    def __init__(self, numbers: Sequence[str], capacities: Sequence[Tuple[int, int, int]],
+                 max_days: int, max_slots: int):
+        self.numbers: List[str] = list(numbers)
+        self.capacity = np.array(capacities, dtype=np.int32).reshape(len(self.numbers), 3)
+        self.free = np.broadcast_to(
+            self.capacity, (max_days, max_slots) + self.capacity.shape
+        ).copy()
+        self.totals = self.free.sum(axis=(2, 3))
+        self.type_totals = self.free.sum(axis=2)
+        self.usable = self.free.any(axis=3).sum(axis=2)
+        self.seatable = (self.free[..., :2].max(axis=3) + self.free[..., 2]).sum(axis=2)
+        # Seats of one (day, slot) with every hall empty
+        self.slot_capacity = int(self.capacity.sum())
+
+    def seats(self, day: int, slot: int, hall: int, kind: int) -> int:
+        return int(self.free[day, slot, hall, kind])
+
+    def set_seats(self, day: int, slot: int, hall: int, kind: int, seats: int):
+        """Sets the free seats of one seat type of a hall and the running counters of its slot."""
+        cell = self.free[day, slot, hall]
+        odd, even, single = cell.tolist()
+        was_usable = odd or even or single
+        was_seatable = max(odd, even) + single
+
+        change = seats - int(cell[kind])
+        cell[kind] = seats
+        odd, even, single = cell.tolist()
+
+        self.totals[day, slot] += change
+        self.type_totals[day, slot, kind] += change
+        self.usable[day, slot] += bool(odd or even or single) - bool(was_usable)
+        self.seatable[day, slot] += max(odd, even) + single - was_seatable
+
+    def reset_slot(self, day: int, slot: int):
+        """Frees every seat of a (day, slot)."""
+        self.free[day, slot] = self.capacity
+        self.totals[day, slot] = self.capacity.sum()
+        self.type_totals[day, slot] = self.capacity.sum(axis=0)
+        self.usable[day, slot] = self.capacity.any(axis=1).sum()
+        self.seatable[day, slot] = (self.capacity[:, :2].max(axis=1) + self.capacity[:, 2]).sum()
+
+    def total(self, day: int, slot: int) -> int:
+        """Free seats over all halls of a (day, slot)."""
+        return int(self.totals[day, slot])
+
+    def max_course_seats(self, day: int, slot: int) -> int:
+        """Most students a single course can be seated with in a (day, slot)."""
+        return int(self.seatable[day, slot])
+
+    def utilization(self) -> np.ndarray:
+        """Fraction of the seats taken in every (day, slot)."""
+        if not self.slot_capacity:
+            return np.zeros(self.totals.shape)
+        return 1 - self.totals / self.slot_capacity
+
+    def copy(self) -> 'HallTable':
+        """Independent copy of the seat state, e.g. for a what-if run."""
+        table = HallTable.__new__(HallTable)
+        table.numbers = self.numbers
+        table.capacity = self.capacity
+        table.slot_capacity = self.slot_capacity
+        for name in ('free', 'totals', 'type_totals', 'usable', 'seatable'):
+            setattr(table, name, getattr(self, name).copy())
+        return table
+
+    def restore(self, snapshot: 'HallTable'):
+        """Puts back the seat state of a copy; the halls viewing this table see it at once."""
+        for name in ('free', 'totals', 'type_totals', 'usable', 'seatable'):
+            getattr(self, name)[...] = getattr(snapshot, name)
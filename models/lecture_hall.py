@@ -1,78 +1,82 @@
+from models.hall_table import HallTable
+
+
+def _seat_property(kind: int):
+    """Free seats of one seat type, read from and written to the hall table."""
+    def get(self) -> int:
+        return self.table.seats(*self.cell, kind)
+
+    def set(self, seats: int):
+        self.table.set_seats(*self.cell, kind, seats)
+
+    return property(get, set)
+
+
+def _flag_property(kind: int):
+    """1 while the seat type has free seats; setting it to 0 occupies them all."""
+    def get(self) -> int:
+        return int(self.table.seats(*self.cell, kind) > 0)
+
+    def set(self, available: int):
+        if not available:
+            self.table.set_seats(*self.cell, kind, 0)
+
+    return property(get, set)
+
+
 class LectureHall:
-    
-    def __init__(self, number: str, odd_capacity: int, even_capacity: int, single_capacity: int, color):
+    """
+    One lecture hall in one (day, slot). The free seats live in a HallTable
+    shared by every hall of the schedule; a hall created without a table gets
+    a table of its own.
+    """
+
+    def __init__(self, number: str, odd_capacity: int, even_capacity: int, single_capacity: int = 0,
+                 color=None, table: HallTable = None, index: int = 0):
         self.number = number
         self.color = color
-        self.color.lecture_halls.append(self)
+        if color is not None:
+            color.lecture_halls.append(self)
+
+        if table is None:
+            table = HallTable([number], [(odd_capacity, even_capacity, single_capacity)], 1, 1)
+            self.cell = (0, 0, 0)
+        else:
+            self.cell = (color.day, color.slot, index)
+        self.table = table
+
+    odd_capacity = _seat_property(0)
+    even_capacity = _seat_property(1)
+    single_capacity = _seat_property(2)
+
+    # 1 indicates available, 0 indicates occupied
+    odd = _flag_property(0)
+    even = _flag_property(1)
+    single = _flag_property(2)
 
-        # 1 indicates available, 0 indicates occupied
-        self.odd = 1
-        self.even = 1
-        self.single = 1
+    @property
+    def odd_available(self) -> bool:
+        return bool(self.odd)
 
-        self.odd_capacity = odd_capacity
-        self.even_capacity = even_capacity
-        self.single_capacity = single_capacity
+    @property
+    def even_available(self) -> bool:
+        return bool(self.even)
+
+    @property
+    def single_available(self) -> bool:
+        return bool(self.single)
 
     def total_capacity(self) -> int:
         """Total available capacity based on seat availability."""
-        if self.odd and self.even and self.single:
-            return self.odd_capacity + self.even_capacity + self.single_capacity
-        elif self.odd and self.even:
-            return self.odd_capacity + self.even_capacity
-        elif self.odd and self.single:
-            return self.odd_capacity + self.single_capacity
-        elif self.single and self.even:
-            return self.single_capacity + self.even_capacity
-        elif self.odd:
-            return self.odd_capacity
-        elif self.even:
-            return self.even_capacity
-        else:
-            return 0
+        return int(self.table.free[self.cell].sum())
+
+    def has_capacity(self) -> bool:
+        return self.total_capacity() > 0
 
     def availability(self) -> dict:
         """Returns availability of seats in odd/even sections."""
-        if self.odd and self.even and self.single:
-            return {
-                "total": self.odd_capacity + self.even_capacity + self.single_capacity,
-                "seats": (self.odd_capacity, self.even_capacity, self.single_capacity)
-            }
-        elif self.odd and self.even:
-            return {
-                "total": self.odd_capacity + self.even_capacity,
-                "seats": (self.odd_capacity, self.even_capacity, 0)
-            }
-        elif self.odd and self.single:
-            return {
-                "total": self.odd_capacity + self.single_capacity,
-                "seats": (self.odd_capacity, 0, self.single_capacity)
-            }
-        elif self.even and self.single:
-            return {
-                "total": self.even_capacity + self.single_capacity,
-                "seats": (0, self.even_capacity, self.single_capacity)
-            }
-        elif self.odd:
-            return {
-                "total": self.odd_capacity,
-                "seats": (self.odd_capacity, 0, 0)
-            }
-        elif self.even:
-            return {
-                "total": self.even_capacity,
-                "seats": (0, self.even_capacity, 0)
-            }
-        elif self.single:
-            return {
-                "total": self.single_capacity,
-                "seats": (0, 0, self.single_capacity)
-            }
-        else:
-            return {
-                "total": 0,
-                "seats": (0, 0, 0)
-            }
+        seats = tuple(int(seat) for seat in self.table.free[self.cell])
+        return {"total": sum(seats), "seats": seats}
 
     def assign_seats(self, seat_type: str):
         """Marks the specified seat type as occupied."""
@@ -0,0 +1,31 @@
+import numpy as np
+
+
+class ExamOccupancy:
+    """Live index of the exams every student has in each day and slot.
+
+    Slots are also addressed by their flat index day * max_slots + slot,
+    which is the ordering the spacing rules are defined on. Rows are students,
+    or enrollment profiles when the courses are grouped into them (see
+    Course.occupancy_rows); the counts of a row then hold for all its students.
+    """
+
+    def __init__(self, no_of_students: int, max_days: int, max_slots: int):
+        self.max_days = max_days
+        self.max_slots = max_slots
+        self.exams = np.zeros((no_of_students, max_days, max_slots), dtype=np.uint8)
+        self.exams_per_day = np.zeros((no_of_students, max_days), dtype=np.uint8)
+        # Flat (students, days * slots) view of the same memory
+        self.flat_exams = self.exams.reshape(no_of_students, max_days * max_slots)
+
+    def add(self, student_ids: np.ndarray, day: int, slot: int):
+        """Records an exam at (day, slot) for every student id (ids must be unique)."""
+        self.exams[student_ids, day, slot] += 1
+        self.exams_per_day[student_ids, day] += 1
+
+    def excess_exams(self, weights: np.ndarray = None, max_exams: int = 2) -> int:
+        """Exams beyond max_exams a day over all rows, each row counted weights[row] times if given."""
+        excess = np.maximum(self.exams_per_day.astype(np.int64) - max_exams, 0).sum(axis=1)
+        if weights is None:
+            return int(excess.sum())
+        return int(excess[:len(weights)] @ weights)
@@ -0,0 +1,163 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from scipy import sparse
+
+from ordering import static_order
+from scheduler import hard_schedule, schedule_violations, update_lecture_hall
+from utils import build_courses, initialize_schedule, occupancy_size
+
+SLOT_JITTER = 2.0  # How many colors the randomized scan order may move a color by
+
+# Read-only conflict graph and courses of the current worker process
+_worker = {}
+
+
+def init_worker(enrollment, codes, rosters, conflicts, max_days, max_slots, ordering, placement="smallest"):
+    """
+    Link the courses once per worker process, from the sparse conflict matrix
+    built by the parent; every start run by the worker reuses them.
+    """
+    graph, courses = build_courses(codes, rosters, enrollment, conflicts)
+    _worker.update(
+        graph=graph,
+        courses=courses,
+        adjacency=[list(course.adjacency_list) for course in courses],
+        occupancy_rows=occupancy_size(courses, len(enrollment)),
+        max_days=max_days,
+        max_slots=max_slots,
+        ordering=ordering,
+        placement=placement,
+    )
+
+
+def schedule_score(courses, graph, color_matrix, max_days, max_slots, no_of_unscheduled_courses):
+    """
+    Score of a schedule, lower is better: unscheduled courses, slots used,
+    relaxed-constraint violations, then lecture halls used.
+    """
+    violations = schedule_violations(courses, graph, color_matrix, max_days, max_slots)
+    slots_used = 0
+    halls_used = 0
+    for row in color_matrix:
+        for color in row:
+            if color.courses:
+                slots_used += 1
+                halls_used += len({hall.number for course in color.courses for hall in course.lecture_hall})
+
+    return (no_of_unscheduled_courses, slots_used, sum(violations.values()), halls_used)
+
+
+def run_start(start_seed):
+    """
+    Run one variant of the hard_schedule cascade in the worker. Start 0 is the
+    plain deterministic cascade; the others break ties in the course order,
+    jitter the slot scan order and shuffle the lecture halls using the seed.
+
+    Returns (score, schedule), schedule as listed by capture_schedule.
+    """
+    start, seed = start_seed
+    rng = random.Random(seed)
+    courses = _worker["courses"]
+    max_days, max_slots = _worker["max_days"], _worker["max_slots"]
+
+    for course, adjacency_list in zip(courses, _worker["adjacency"]):
+        course.reset_schedule()
+        course.adjacency_list = list(adjacency_list)
+    color_matrix = initialize_schedule(_worker["occupancy_rows"], max_days, max_slots)
+
+    order = list(courses)
+    color_order = None
+    if start > 0:
+        # Stable sorts keep the shuffled order among courses with equal keys
+        rng.shuffle(order)
+        for course in courses:
+            rng.shuffle(course.adjacency_list)
+        for row in color_matrix:
+            for color in row:
+                rng.shuffle(color.lecture_halls)
+                color.index_halls()
+        color_order = sorted(
+            range(max_days * max_slots),
+            key=lambda position: position + rng.uniform(0, SLOT_JITTER)
+        )
+
+    no_of_unscheduled_courses = hard_schedule(
+        static_order(order), color_matrix, max_days, max_slots, _worker["ordering"], color_order,
+        _worker["placement"]
+    )
+    score = schedule_score(courses, _worker["graph"], color_matrix, max_days, max_slots, no_of_unscheduled_courses)
+
+    return score, capture_schedule(color_matrix)
+
+
+def capture_schedule(color_matrix):
+    """
+    List (course code, day, slot, [(hall number, position, seats)]) for every
+    scheduled course, per color in placement order.
+    """
+    schedule = []
+    for row in color_matrix:
+        for color in row:
+            for course in color.courses:
+                halls = [
+                    (hall.number, position, seats)
+                    for hall, seating_info in course.lecture_hall.items()
+                    for position, seats in seating_info.items()
+                ]
+                schedule.append((course.course_code, color.day, color.slot, halls))
+    return schedule
+
+
+def restore_schedule(schedule, courses, color_matrix, max_days, max_slots):
+    """
+    Replay a schedule from capture_schedule, with its exact lecture halls, onto the given courses.
+    """
+    course_index = {course.course_code: course for course in courses}
+    for code, day, slot, halls in schedule:
+        color = color_matrix[day][slot]
+        hall_index = {hall.number: hall for hall in color.lecture_halls}
+        hall_list = {}
+        for number, position, seats in halls:
+            hall_list.setdefault(hall_index[number], {})[position] = seats
+        update_lecture_hall(hall_list, course_index[code], color, max_days, max_slots)
+
+
+def multistart_schedule(courses, graph, enrollment, max_days, max_slots, ordering="static",
+                        starts=8, seed=None, workers=None, placement="smallest"):
+    """
+    Run randomized variants of the greedy cascade (with the given placement,
+    see hard_schedule) in a process pool and keep the best one. The sparse
+    conflict matrix is built once here and handed to every worker, which
+    links its courses from it and reuses them for all of its starts.
+    Returns (color_matrix, number of unscheduled courses).
+    """
+    workers = workers or os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    initargs = (
+        enrollment,
+        [course.course_code for course in courses],
+        [course.student_ids for course in courses],
+        sparse.csr_matrix(graph),
+        max_days, max_slots, ordering, placement,
+    )
+    start_seeds = [(start, seed + start) for start in range(starts)]
+
+    if workers > 1 and starts > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+            results = list(pool.map(run_start, start_seeds))
+    else:
+        init_worker(*initargs)
+        results = [run_start(start_seed) for start_seed in start_seeds]
+
+    best = min(range(starts), key=lambda start: results[start][0])
+    score, schedule = results[best]
+    print(f"Multi-start (seed {seed}): best of {starts} is start {best} with "
+          f"{score[0]} unscheduled, {score[1]} slots, {score[2]} violations, {score[3]} halls")
+
+    color_matrix = initialize_schedule(occupancy_size(courses, len(enrollment)), max_days, max_slots)
+    restore_schedule(schedule, courses, color_matrix, max_days, max_slots)
+    return color_matrix, score[0]
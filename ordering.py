@@ -0,0 +1,67 @@
+import heapq
+
+
+def static_order(courses):
+    """
+    Order courses by degree and maximum adjacency, highest first.
+    """
+    return sorted(
+        courses,
+        key=lambda course: (course.degree, course.max_adjacency),
+        reverse=True
+    )
+
+
+class DSaturQueue:
+    """
+    Priority queue of uncolored courses for DSatur ordering.
+
+    Courses are keyed by saturation degree (number of distinct colors among
+    their adjacent courses), then degree and maximum adjacency, then their
+    original position. Saturation only grows, so outdated heap entries are
+    skipped when popped instead of being removed, and coloring a course
+    costs O(degree log n).
+    """
+
+    def __init__(self, courses):
+        self.courses = list(courses)
+        self.position = {course: i for i, course in enumerate(self.courses)}
+        self.neighbour_colors = {}
+        self.heap = []
+
+        for course in self.courses:
+            # Adjacent courses colored in earlier passes already saturate
+            self.neighbour_colors[course] = {
+                adj_course.color for adj_course in course.adjacency_list if adj_course.color
+            }
+            self.heap.append(self._entry(course))
+        heapq.heapify(self.heap)
+
+    def _entry(self, course):
+        saturation = len(self.neighbour_colors[course])
+        return (-saturation, -course.degree, -course.max_adjacency, self.position[course], saturation)
+
+    def pop(self):
+        """
+        Remove and return the most saturated uncolored course, None when empty.
+        """
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            course = self.courses[entry[3]]
+            if course in self.neighbour_colors and entry[4] == len(self.neighbour_colors[course]):
+                del self.neighbour_colors[course]
+                return course
+        return None
+
+    def colored(self, course, color):
+        """
+        Update the saturation of the uncolored courses adjacent to a newly colored course.
+        """
+        for adj_course in course.adjacency_list:
+            colors = self.neighbour_colors.get(adj_course)
+            if colors is not None and color not in colors:
+                colors.add(color)
+                heapq.heappush(self.heap, self._entry(adj_course))
+
+    def __len__(self):
+        return len(self.neighbour_colors)
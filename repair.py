@@ -0,0 +1,155 @@
+from graph_update import schedule_positions
+from ordering import static_order
+from scheduler import allocate_lecture_halls, hard_schedule, place_course, update_lecture_hall
+from utils import initialize_schedule, occupancy_size
+
+# The schedule main publishes, read before the run overwrites it
+PREVIOUS_SCHEDULE = 'exam_schedule.csv'
+
+
+def load_previous_schedule(course_index, filename=PREVIOUS_SCHEDULE):
+    """
+    Set old_day and old_slot (1-based, 0 when unknown) of the courses from a
+    schedule written by main. Codes without a course are ignored. Returns the
+    number of courses given a previous slot.
+    """
+    positions = schedule_positions(filename)
+
+    found = 0
+    for course_code, course in course_index.items():
+        old_day, old_slot = positions.get(course_code, (0, 0))
+        course.old_day, course.old_slot = int(old_day), int(old_slot)
+        found += bool(course.old_day)
+    return found
+
+
+def previous_position(course, max_days, max_slots):
+    """Flat position of the course's previous slot, None if it has none in this calendar."""
+    if 1 <= course.old_day <= max_days and 1 <= course.old_slot <= max_slots:
+        return (course.old_day - 1) * max_slots + course.old_slot - 1
+    return None
+
+
+def nearest_colors(position, max_days, max_slots):
+    """Every flat color position, the ones closest to position first."""
+    return sorted(range(max_days * max_slots), key=lambda p: (abs(p - position), p))
+
+
+def repair_schedule(courses, no_of_students, max_days, max_slots, ordering="static", placement="smallest"):
+    """
+    Rebuild a schedule from the previous one with as few moves as possible.
+    Every course whose previous slot still has no clash and enough seats keeps
+    it, largest course first, so of two courses that now share students the
+    smaller one moves. Only the displaced courses are searched for, each
+    trying the slots nearest its previous one first through the relaxation
+    cascade; whatever still fails goes through hard_schedule. placement is
+    the color choice of relaxed stages, see hard_schedule.
+
+    When courses are left unscheduled, every one of them evicts the kept
+    courses it clashes with in the slot where they are fewest (see
+    cheapest_blockers) and the repair runs again, the unscheduled courses
+    placed before the evicted ones, until everything is scheduled or nothing
+    new is evicted. The run leaving the fewest courses unscheduled is kept.
+
+    Returns (color_matrix, number of unscheduled courses, courses moved from
+    their previous slot, courses evicted to make room).
+    """
+    evicted = set()
+    best = None
+    while True:
+        color_matrix, no_of_unscheduled_courses, displaced = repair_pass(
+            courses, no_of_students, max_days, max_slots, evicted, ordering, placement
+        )
+        if best is None or no_of_unscheduled_courses < best[0]:
+            best = (no_of_unscheduled_courses, set(evicted))
+        if not no_of_unscheduled_courses:
+            break
+        kept = set(courses) - set(displaced)
+        blockers = set()
+        for course in courses:
+            if not course.color:
+                blockers |= cheapest_blockers(course, kept)
+        blockers -= evicted
+        if not blockers:
+            break
+        evicted |= blockers
+        for course in courses:
+            course.reset_schedule()
+
+    if evicted != best[1]:
+        evicted = best[1]
+        for course in courses:
+            course.reset_schedule()
+        color_matrix, no_of_unscheduled_courses, _ = repair_pass(
+            courses, no_of_students, max_days, max_slots, evicted, ordering, placement
+        )
+
+    moved = moved_courses(courses, max_days, max_slots)
+    evicted = [course for course in moved if course in evicted]
+    kept = sum(1 for course in courses if course.old_day and course.color) - len(moved)
+    print(f"Repair: kept {kept} of {len(courses)} courses in place, "
+          f"moved {len(moved)} ({len(evicted)} evicted to make room)")
+    return color_matrix, no_of_unscheduled_courses, moved, evicted
+
+
+def moved_courses(courses, max_days, max_slots):
+    """The scheduled courses that had a previous slot and are now in another one."""
+    return [
+        course for course in courses
+        if course.color and course.old_day and previous_position(course, max_days, max_slots)
+        != course.color.day * max_slots + course.color.slot
+    ]
+
+
+def cheapest_blockers(course, kept):
+    """
+    The kept courses adjacent to course in the color where they are fewest
+    (fewest students on a tie), empty if no kept course blocks it.
+    """
+    by_color = {}
+    for adj in course.adjacency_list:
+        if adj in kept and adj.color:
+            by_color.setdefault(adj.color, []).append(adj)
+    if not by_color:
+        return set()
+    blockers = min(
+        by_color.values(),
+        key=lambda adjs: (len(adjs), sum(adj.no_of_students for adj in adjs))
+    )
+    return set(blockers)
+
+
+def repair_pass(courses, no_of_students, max_days, max_slots, evicted, ordering="static", placement="smallest"):
+    """
+    One repair of the previous schedule with the courses in evicted moved out
+    of their previous slots. Returns (color_matrix, number of unscheduled
+    courses, displaced courses).
+    """
+    color_matrix = initialize_schedule(occupancy_size(courses, no_of_students), max_days, max_slots)
+
+    displaced = []
+    for course in sorted(courses, key=lambda course: course.no_of_students, reverse=True):
+        position = previous_position(course, max_days, max_slots)
+        if position is None or course in evicted or course.forbidden_mask >> position & 1:
+            displaced.append(course)
+            continue
+        color = color_matrix[position // max_slots][position % max_slots]
+        hall_list = allocate_lecture_halls(course, color, max_days, max_slots)
+        if course.no_of_students > 0 and not hall_list:
+            displaced.append(course)
+            continue
+        update_lecture_hall(hall_list, course, color, max_days, max_slots)
+
+    # The courses that lost their slot first, then the ones evicted for them
+    unplaced = []
+    for course in (static_order([course for course in displaced if course not in evicted])
+                   + static_order([course for course in displaced if course in evicted])):
+        position = previous_position(course, max_days, max_slots)
+        color_order = None if position is None else nearest_colors(position, max_days, max_slots)
+        if not place_course(course, color_matrix, max_days, max_slots, color_order, placement):
+            unplaced.append(course)
+
+    no_of_unscheduled_courses = hard_schedule(
+        unplaced, color_matrix, max_days, max_slots, ordering, placement=placement
+    ) if unplaced else 0
+    return color_matrix, no_of_unscheduled_courses, displaced
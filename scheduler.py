@@ -1,21 +1,14 @@
+import numpy as np
+
 from models import Course, Student, Color, LectureHall
 
 from utils import (
     initialize_colors,
-    get_lecture_hall,
     GAMMA
 )
 from utils import calculate_common_students, calculate_degree
-
-def get_first_node_color(course, color_matrix, max_days, max_slots):
-
-    for j in range(max_days):
-        for k in range(max_slots):
-            hall_list = get_lecture_hall(course.no_of_students, color_matrix[j][k], max_days, max_slots)
-            if hall_list:
-                return color_matrix[j][k], hall_list
-
-    return None
+from ordering import static_order, DSaturQueue
+from constraints import Constraints, SOFT_RULES
 
 def update_lecture_hall(hall_list, course, color, max_days, max_slots):
     """
@@ -45,7 +38,9 @@ def update_lecture_hall(hall_list, course, color, max_days, max_slots):
                     else:
                         hall.single_capacity = 0
                         hall.single = 0  # Set hall as unavailable for even seating 
-                
+
+        if color.hall_index is not None:
+            color.hall_index.update(course.lecture_hall)
 
 def dis_1(color_1, color_2, max_days, max_slots):
     """
@@ -87,83 +82,78 @@ def total_dis(color_1, color_2, max_days, max_slots):
     return GAMMA * d2 + d1
 
 
-def check_three_exams_constraint(course, color_jk, day, color_matrix, max_days, max_slots):
+def allocate_lecture_halls(course, color, max_days, max_slots):
     """
-    Ensure that no student has more than two exams on the same day.
+    Select lecture halls with free seats in color for all students of the course.
     """
-    students = course.student_list
+    if course.no_of_students > color.max_course_seats():
+        # Cannot fit whatever halls are picked
+        return {}
+    hall_index = color.hall_index or color.index_halls()
+    return hall_index.allocate(course.no_of_students)
 
-    for student in students:
-        counter = 0
-        for slot in range(max_slots):
-            course_list = color_matrix[day][slot].courses
-            for scheduled_course in course_list:
-                if student in scheduled_course.student_list:
-                    counter += 1
-                    if counter == 2:
-                        return False
 
-    return True
+def schedule_constraints(color_matrix, max_days, max_slots):
+    """
+    The rule engine of a schedule, built on first use and shared by its colors.
+    """
+    constraints = color_matrix[0][0].constraints
+    if constraints is None:
+        constraints = Constraints(color_matrix, max_days, max_slots)
+        for row in color_matrix:
+            for color in row:
+                color.constraints = constraints
+    return constraints
 
 
-def get_smallest_available_color(course, color_matrix, constraints, max_days, max_slots):
+def iter_available_colors(available, color_order=None):
     """
-    Find the smallest available color for a course that satisfies all constraints.
+    Yield the flat positions of the colors set in the available bitmask,
+    smallest first, or in the order of color_order if given.
     """
-    adj_list = course.adjacency_list
-    for day in range(max_days):
-      for slot in range(max_slots):
-        valid = True
+    if color_order is None:
+        while available:
+            # Lowest set bit is the smallest color still in the domain
+            lowest = available & -available
+            available ^= lowest
+            yield lowest.bit_length() - 1
+    else:
+        for position in color_order:
+            if available >> position & 1:
+                yield position
 
-        color = color_matrix[day][slot]
-         
-        sorted_list = []
-        for lh in color.lecture_halls:
-            if lh.odd > 0 and lh.odd_capacity > 0:
-                sorted_list.append(((lh, 'o'), lh.odd_capacity))
-            if lh.even > 0 and lh.even_capacity > 0:
-                sorted_list.append(((lh, 'e'), lh.even_capacity))
-            if lh.single > 0 and lh.single_capacity > 0:
-                sorted_list.append(((lh, 's'), lh.single_capacity))
-         
-        assigned_lh = get_lecture_hall(course.no_of_students, sorted_list, max_days, max_slots)
-        
-        if not assigned_lh:
-            valid = False
-            continue
-
-        for adj_course in adj_list:
-            color_adj = adj_course.color
-            if color_adj:
-                if color_adj.day != day or color_adj.slot != slot:
-                    if "check_dis_3" in constraints:
-                        if not dis_3(color_adj, color_matrix[day][slot], max_days, max_slots):
-                            valid = False
-                            break
-
-                    if "check_consecutive" in constraints:
-                        if dis_2(color_adj, color_matrix[day][slot], max_days, max_slots) == 0:
-                            if dis_1(color_adj, color_matrix[day][slot], max_days, max_slots) <= 1:
-                                valid = False
-                                break
-
-                    if "check_three_exams" in constraints:
-                        if not check_three_exams_constraint(course, color_matrix[day][slot], day, color_matrix, max_days, max_slots):
-                            valid = False
-                            break
-                else:
-                    valid = False
-                    break
-            else:
-                continue
 
-        if valid:
-            return color_matrix[day][slot], assigned_lh
+def get_smallest_available_color(course, color_matrix, constraints, max_days, max_slots, color_order=None,
+                                 placement="smallest"):
+    """
+    Find the smallest available color for a course that satisfies all constraints,
+    a set of the soft rule names of constraints.Constraints (the hard rules always apply).
+    color_order optionally replaces the smallest-first scan order of the colors. With
+    the least_cost placement, a relaxed rule set takes the color of least soft-rule
+    cost, ties broken by the scan order.
+    """
+    engine = schedule_constraints(color_matrix, max_days, max_slots)
+    if placement == "least_cost" and set(constraints) != set(SOFT_RULES):
+        # A relaxed rule set: of the colors it allows, least soft-rule violations first
+        feasible, cost = engine.evaluate(course, constraints)
+        order = np.arange(len(feasible)) if color_order is None else np.array(color_order, dtype=int)
+        candidates = order[feasible[order]]
+        positions = candidates[np.argsort(cost[candidates], kind='stable')].tolist()
+    else:
+        positions = iter_available_colors(engine.available(course, constraints), color_order)
+
+    for position in positions:
+        color = color_matrix[position // max_slots][position % max_slots]
+        assigned_lh = allocate_lecture_halls(course, color, max_days, max_slots)
+
+        if assigned_lh:
+            return color, assigned_lh
 
     return None
 
 
-def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, max_slots):
+def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, max_slots, color_order=None,
+                  placement="smallest"):
     """
     Assign colors to courses based on sorted order and constraints.
     """
@@ -174,7 +164,8 @@ def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, ma
             break
 
         if not course.color and course.flag:
-            if sorted_courses.index(course) == 0 and count == 0:
+            # Only a course with no colored adjacent course can skip the constraint checks
+            if sorted_courses.index(course) == 0 and count == 0 and not course.forbidden_mask:
                 res = get_first_node_color(course, color_matrix, max_days, max_slots)
                 if res:
                     color, hall_list = res
@@ -182,7 +173,9 @@ def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, ma
                     print("No schedule is possible")
                     break
             else:
-                res = get_smallest_available_color(course, color_matrix, constraints, max_days, max_slots)
+                res = get_smallest_available_color(
+                    course, color_matrix, constraints, max_days, max_slots, color_order, placement
+                )
                 if res:
                     color, hall_list = res
                 else:
@@ -197,7 +190,9 @@ def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, ma
         ordered_adj_list = course.ordered_adjacency_list()
         for adj_course in ordered_adj_list:
             if not adj_course.color and adj_course.flag:
-                res = get_smallest_available_color(adj_course, color_matrix, constraints, max_days, max_slots)
+                res = get_smallest_available_color(
+                    adj_course, color_matrix, constraints, max_days, max_slots, color_order, placement
+                )
                 if res:
                     color_cd, hall_list_cd = res
                 else:
@@ -220,31 +215,133 @@ def schedule_exam(sorted_courses, constraints, count, color_matrix, max_days, ma
     for c in unalloted_courses:
         c.flag = 1
 
-    return sorted(
-        unalloted_courses,
-        key=lambda course: (course.degree, course.max_adjacency),
-        reverse=True
-    )
+    return static_order(unalloted_courses)
 
 
-def hard_schedule(unalloted_courses, color_matrix, max_days, max_slots):
+def schedule_exam_dsatur(courses, constraints, count, color_matrix, max_days, max_slots, color_order=None,
+                         placement="smallest"):
     """
-    Attempt to schedule remaining courses by progressively relaxing constraints.
+    Assign colors to courses in DSatur order: always color the uncolored course
+    whose adjacent courses already use the most distinct colors.
+    """
+    queue = DSaturQueue([course for course in courses if not course.color])
+
+    course = queue.pop()
+    while course:
+        res = get_smallest_available_color(
+            course, color_matrix, constraints, max_days, max_slots, color_order, placement
+        )
+        if res:
+            color, hall_list = res
+            update_lecture_hall(hall_list, course, color, max_days, max_slots)
+            queue.colored(course, color)
+        course = queue.pop()
+
+    return static_order([course for course in courses if not course.color])
+
+
+def place_course(course, color_matrix, max_days, max_slots, color_order=None, placement="smallest"):
+    """
+    Color one course on its own: the smallest color (or the first in
+    color_order) that allows it and seats its students, relaxing the rule set
+    stage by stage, placement as in hard_schedule. Returns whether it was placed.
+    """
+    for constraints, _ in RELAXATION_STAGES:
+        res = get_smallest_available_color(
+            course, color_matrix, constraints, max_days, max_slots, color_order, placement
+        )
+        if res:
+            color, hall_list = res
+            update_lecture_hall(hall_list, course, color, max_days, max_slots)
+            return True
+    return False
+
+
+def apply_schedule(assignment, color_matrix, max_days, max_slots):
+    """
+    Place courses in the colors given by assignment (course -> (day, slot)),
+    allocating lecture halls largest course first. Returns the courses whose
+    students no longer fit in the halls of their slot.
+    """
+    unplaced = []
+    for course in sorted(assignment, key=lambda course: course.no_of_students, reverse=True):
+        day, slot = assignment[course]
+        color = color_matrix[day][slot]
+        hall_list = allocate_lecture_halls(course, color, max_days, max_slots)
+        if hall_list:
+            update_lecture_hall(hall_list, course, color, max_days, max_slots)
+        else:
+            unplaced.append(course)
+
+    return static_order(unplaced)
+
+
+def schedule_violations(courses, graph, color_matrix, max_days, max_slots):
+    """
+    Count the relaxed-constraint violations of a schedule, each weighted by the
+    number of students affected: consecutive exams, exams less than 4 colors
+    apart (dis_3) and exams beyond two a day. courses must follow graph's order.
     """
-    constraints = ["check_consecutive", "check_three_exams", "check_dis_3"]
-    unalloted_courses = schedule_exam(unalloted_courses, constraints, 0, color_matrix, max_days, max_slots)
+    position = np.array([
+        course.color.day * max_slots + course.color.slot if course.color else -1
+        for course in courses
+    ])
+    rows, cols = np.triu(graph, 1).nonzero()
+    placed = (position[rows] >= 0) & (position[cols] >= 0)
+    rows, cols = rows[placed], cols[placed]
+
+    weights = graph[rows, cols]
+    distance = np.abs(position[rows] - position[cols])
+    same_day = position[rows] // max_slots == position[cols] // max_slots
+
+    occupancy = color_matrix[0][0].occupancy
+    three_exams = 0
+    if occupancy is not None:
+        three_exams = occupancy.excess_exams(courses[0].profile_weights if courses else None)
+
+    return {
+        "consecutive": int(weights[(distance == 1) & same_day].sum()),
+        "dis_3": int(weights[distance < 4].sum()),
+        "three_exams": three_exams,
+    }
+
+
+# Constraint sets of the cascade, strictest first, with the pass count handed to the scheduler
+RELAXATION_STAGES = (
+    (SOFT_RULES, 0),
+    (("maximum_exams_per_day",), 1),
+    (("minimum_gap",), 1),
+    (("no_consecutive_exams",), 2),
+    ((), 3),
+)
 
-    constraints = ["check_three_exams"]
-    unalloted_courses = schedule_exam(unalloted_courses, constraints, 1, color_matrix, max_days, max_slots)
+PLACEMENTS = ("smallest", "least_cost")
 
-    constraints = ["check_dis_3"]
-    unalloted_courses = schedule_exam(unalloted_courses, constraints, 1, color_matrix, max_days, max_slots)
+SCHEDULERS = {
+    "static": schedule_exam,
+    "dsatur": schedule_exam_dsatur,
+}
 
-    constraints = ["check_consecutive"]
-    unalloted_courses = schedule_exam(unalloted_courses, constraints, 2, color_matrix, max_days, max_slots)
 
-    constraints = [""]
-    unalloted_courses = schedule_exam(unalloted_courses, constraints, 3, color_matrix, max_days, max_slots)
+def hard_schedule(unalloted_courses, color_matrix, max_days, max_slots, ordering="static", color_order=None,
+                  placement="smallest"):
+    """
+    Attempt to schedule remaining courses by progressively relaxing constraints.
+    ordering selects the course ordering engine, one of SCHEDULERS, and
+    color_order optionally sets the order colors are tried in. placement, one of
+    PLACEMENTS, picks the color once a rule has been relaxed: the smallest one
+    (fewest slots) or the one violating the relaxed rules for fewest students.
+    """
+    if ordering not in SCHEDULERS:
+        raise ValueError(f"Unknown ordering '{ordering}'. Choose one of: {', '.join(SCHEDULERS)}.")
+    if placement not in PLACEMENTS:
+        raise ValueError(f"Unknown placement '{placement}'. Choose one of: {', '.join(PLACEMENTS)}.")
+    schedule = SCHEDULERS[ordering]
+
+    for constraints, count in RELAXATION_STAGES:
+        unalloted_courses = schedule(
+            unalloted_courses, constraints, count, color_matrix, max_days, max_slots, color_order, placement
+        )
 
     return len(unalloted_courses)
 
@@ -256,17 +353,7 @@ def get_first_node_color(course, color_matrix, max_days, max_slots):
     for day in range(max_days):
         for slot in range(max_slots):
             color = color_matrix[day][slot]
-            
-            sorted_list = []
-            for lh in color.lecture_halls:
-                if lh.odd > 0:
-                    sorted_list.append(((lh, 'o'), lh.odd_capacity))
-                if lh.even > 0:
-                    sorted_list.append(((lh, 'e'), lh.even_capacity))
-                if lh.single > 0:
-                    sorted_list.append(((lh, 's'), lh.single_capacity))
-             
-            hall_list = get_lecture_hall(course.no_of_students, sorted_list, max_days, max_slots)
+            hall_list = allocate_lecture_halls(course, color, max_days, max_slots)
             
             if hall_list:
                 return color, hall_list
@@ -0,0 +1,212 @@
+import numpy as np
+from collections import Counter
+from ortools.sat.python import cp_model
+
+from utils import initialize_schedule, get_slot_capacity, occupancy_size
+from scheduler import apply_schedule, hard_schedule
+from constraints import SOFT_RULES
+from kernel import peel_courses, restore_peeled
+from ordering import static_order
+
+BACKENDS = ("greedy", "cp_sat")
+CP_SAT_TIME_LIMIT = 60.0  # seconds
+CP_SAT_WORKERS = 8
+
+
+def student_course_sets(courses):
+    """
+    Count the students sharing each set of course indices, keeping only sets of
+    three or more courses (the only ones the three-exams rule can apply to).
+    Grouped courses are walked once per enrollment profile, not per student.
+    """
+    enrolled = {}
+    students = {}
+    for i, course in enumerate(courses):
+        rows, weights = course.occupancy_rows()
+        if weights is None:
+            weights = np.ones(len(rows), dtype=np.int64)
+        for row, weight in zip(rows.tolist(), weights.tolist()):
+            enrolled.setdefault(row, []).append(i)
+            students[row] = weight
+
+    sets = Counter()
+    for row, course_set in enrolled.items():
+        if len(course_set) > 2:
+            sets[tuple(course_set)] += students[row]
+    return sets
+
+
+def solve_cp_sat(courses, graph, slot_capacity, max_days, max_slots,
+                 constraints=SOFT_RULES, time_limit=CP_SAT_TIME_LIMIT,
+                 workers=CP_SAT_WORKERS):
+    """
+    Schedule courses with the CP-SAT solver.
+
+    Clashes between adjacent courses and the total seats of every (day, slot)
+    are hard constraints. The consecutive, three-exams and dis_3 spacing rules
+    of hard_schedule are soft, each violation weighted by the number of
+    students it affects. The objective is the number of slots used first and
+    the total violation weight second. Courses that already have a color (the
+    greedy schedule) are used as a solution hint.
+
+    Returns a dict mapping each course to its (day, slot), or None when no
+    schedule was found within the time limit.
+    """
+    model = cp_model.CpModel()
+    total_colors = max_days * max_slots
+    n = len(courses)
+
+    # x[i][k]: course i is in color k (flat index day * max_slots + slot)
+    x = [[model.NewBoolVar(f"x_{i}_{k}") for k in range(total_colors)] for i in range(n)]
+    position = [model.NewIntVar(0, total_colors - 1, f"p_{i}") for i in range(n)]
+    day = [model.NewIntVar(0, max_days - 1, f"d_{i}") for i in range(n)]
+    slot = [model.NewIntVar(0, max_slots - 1, f"s_{i}") for i in range(n)]
+    for i in range(n):
+        model.AddExactlyOne(x[i])
+        model.Add(position[i] == sum(k * x[i][k] for k in range(total_colors)))
+        model.Add(position[i] == max_slots * day[i] + slot[i])
+
+    # Seats: the students of a color must fit in its lecture halls
+    for k in range(total_colors):
+        model.Add(
+            sum(course.no_of_students * x[i][k] for i, course in enumerate(courses))
+            <= slot_capacity[k]
+        )
+
+    penalties = []
+    rows, cols = np.triu(graph, 1).nonzero()
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        weight = int(graph[i][j])
+        model.Add(position[i] != position[j])
+
+        distance = model.NewIntVar(0, total_colors - 1, f"dist_{i}_{j}")
+        model.AddAbsEquality(distance, position[i] - position[j])
+
+        if "minimum_gap" in constraints:
+            # Same window as dis_3: colors less than 4 apart are too close
+            near = model.NewBoolVar(f"near_{i}_{j}")
+            model.Add(distance >= 4).OnlyEnforceIf(near.Not())
+            penalties.append(weight * near)
+
+        if "no_consecutive_exams" in constraints and max_slots > 1:
+            consecutive = model.NewBoolVar(f"consecutive_{i}_{j}")
+            apart = model.NewBoolVar(f"apart_{i}_{j}")
+            other_day = model.NewBoolVar(f"other_day_{i}_{j}")
+            model.Add(distance >= 2).OnlyEnforceIf(apart)
+            model.Add(day[i] != day[j]).OnlyEnforceIf(other_day)
+            model.AddBoolOr([apart, other_day, consecutive])
+            penalties.append(weight * consecutive)
+
+    if "maximum_exams_per_day" in constraints and max_slots > 2:
+        on_day = [
+            [sum(x[i][d * max_slots + s] for s in range(max_slots)) for d in range(max_days)]
+            for i in range(n)
+        ]
+        for course_set, students in student_course_sets(courses).items():
+            for d in range(max_days):
+                excess = model.NewIntVar(0, len(course_set), "")
+                model.Add(excess >= sum(on_day[i][d] for i in course_set) - 2)
+                penalties.append(students * excess)
+
+    # Slots used come first: one slot outweighs every possible violation
+    used = [model.NewBoolVar(f"used_{k}") for k in range(total_colors)]
+    for k in range(total_colors):
+        for i in range(n):
+            model.AddImplication(x[i][k], used[k])
+    slot_weight = int(graph.sum()) * 2 + sum(course.no_of_students for course in courses) + 1
+    model.Minimize(slot_weight * sum(used) + sum(penalties))
+
+    # Warm start from the colors already assigned
+    for i, course in enumerate(courses):
+        if course.color:
+            hinted = course.color.day * max_slots + course.color.slot
+            for k in range(total_colors):
+                model.AddHint(x[i][k], k == hinted)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = workers
+    status = solver.Solve(model)
+
+    print(f"CP-SAT status: {solver.StatusName(status)}, objective: {solver.ObjectiveValue()}, "
+          f"bound: {solver.BestObjectiveBound()}")
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    return {
+        course: divmod(solver.Value(position[i]), max_slots)
+        for i, course in enumerate(courses)
+    }
+
+
+def cp_sat_schedule(courses, graph, no_of_students, max_days, max_slots, ordering="static",
+                    time_limit=CP_SAT_TIME_LIMIT, workers=CP_SAT_WORKERS, hall_share=1.0, placement="smallest"):
+    """
+    Re-solve the greedy schedule currently held by the courses with CP-SAT and
+    write the result into a fresh color matrix. Courses that no longer fit in
+    the halls of their slot go back through hard_schedule.
+
+    Returns (color_matrix, number of unscheduled courses), or None when CP-SAT
+    found no schedule and the greedy one should be kept.
+    """
+    color_matrix = initialize_schedule(occupancy_size(courses, no_of_students), max_days, max_slots, hall_share)
+    slot_capacity = get_slot_capacity(color_matrix, max_days, max_slots)
+
+    assignment = solve_cp_sat(courses, graph, slot_capacity, max_days, max_slots,
+                              time_limit=time_limit, workers=workers)
+    if assignment is None:
+        return None
+
+    for course in courses:
+        course.reset_schedule()
+    unplaced = apply_schedule(assignment, color_matrix, max_days, max_slots)
+    return color_matrix, hard_schedule(unplaced, color_matrix, max_days, max_slots, ordering, placement=placement)
+
+
+def schedule_courses(courses, graph, no_of_students, max_days, max_slots, ordering="static", backend="greedy",
+                     placement="smallest", kernelize=False, hall_share=1.0,
+                     cp_sat_time_limit=CP_SAT_TIME_LIMIT, cp_sat_workers=CP_SAT_WORKERS):
+    """
+    Schedule courses into a fresh color matrix with the chosen backend; the
+    cp_sat backend gets cp_sat_time_limit seconds and cp_sat_workers workers.
+    placement is the color choice of the greedy cascade (see hard_schedule).
+    With kernelize, courses with fewer adjacent courses than colors are peeled
+    off first (see kernel.peel_courses): the backend only schedules the core
+    and the peeled courses are fitted in afterwards. hall_share is the fraction
+    of every lecture hall the courses may use (see initialize_lecture_halls).
+    Returns (color_matrix, number of unscheduled courses).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of: {', '.join(BACKENDS)}.")
+
+    core, peeled = peel_courses(courses, max_days * max_slots) if kernelize else (courses, [])
+    for course in peeled:
+        # Left out of the core stages, adjacency walks included
+        course.flag = False
+    if peeled:
+        print(f"Kernel: {len(core)} core courses, {len(peeled)} peeled")
+
+    color_matrix = initialize_schedule(occupancy_size(courses, no_of_students), max_days, max_slots, hall_share)
+    no_of_unscheduled_courses = hard_schedule(
+        static_order(core), color_matrix, max_days, max_slots, ordering, placement=placement
+    )
+
+    if backend == "cp_sat":
+        # The greedy schedule is the warm start for the exact solver
+        core_graph = graph
+        if peeled:
+            index = {course: i for i, course in enumerate(courses)}
+            rows = [index[course] for course in core]
+            core_graph = graph[np.ix_(rows, rows)]
+        result = cp_sat_schedule(core, core_graph, no_of_students, max_days, max_slots, ordering,
+                                 cp_sat_time_limit, cp_sat_workers, hall_share, placement)
+        if result:
+            color_matrix, no_of_unscheduled_courses = result
+
+    if peeled:
+        unplaced = restore_peeled(peeled, color_matrix, max_days, max_slots, placement)
+        no_of_unscheduled_courses += hard_schedule(
+            static_order(unplaced), color_matrix, max_days, max_slots, ordering, placement=placement
+        )
+
+    return color_matrix, no_of_unscheduled_courses
@@ -3,6 +3,11 @@ from models.course import Course
 from models.student import Student
 from models.color import Color
 from models.lecture_hall import LectureHall
+from models.enrollment import Enrollment
+from models.occupancy import ExamOccupancy
+from models.hall_index import HallIndex
+from models.hall_table import HallTable
+import numpy as np
 
 class TestCourse(unittest.TestCase):
     def setUp(self):
@@ -52,6 +57,79 @@ class TestCourse(unittest.TestCase):
         self.course.assign_color(color)
         self.assertEqual(self.course.color, color)
         self.assertIn(self.course, color.courses)
+    def test_assign_color_forbids_adjacent(self):
+        course2 = Course(2, 'CS102', {'S2', 'S3'}, 0, 0)
+        self.course.adjacency_list = [course2]
+        color = Color(day=1, slot=0)
+        color.set_grid(max_days=3, max_slots=2)
+        self.course.assign_color(color)
+        # Flat position of day 1 slot 0 is 2
+        self.assertEqual(course2.forbidden_mask, 0b100)
+        self.assertEqual(course2.forbidden_consecutive, 0b1100)
+        self.assertEqual(course2.forbidden_spacing, 0b111111)
+
+    def test_course_with_roster(self):
+        enrollment = Enrollment()
+        course = Course(2, 'CS102', enrollment.roster(['S3', 'S1', 'S3']))
+        self.assertEqual(course.no_of_students, 2)
+        self.assertEqual(course.student_ids.tolist(), [0, 1])
+        self.assertIn('S1', course.student_list)
+        self.assertNotIn('S2', course.student_list)
+
+
+class TestEnrollment(unittest.TestCase):
+    def setUp(self):
+        self.enrollment = Enrollment()
+        self.roster1 = self.enrollment.roster(['S1', 'S2', 'S3'])
+        self.roster2 = self.enrollment.roster(['S3', 'S4', 'S2'])
+
+    def test_intern(self):
+        self.assertEqual(len(self.enrollment), 4)
+        self.assertEqual(self.enrollment.intern('S4'), 3)
+        self.assertEqual(self.enrollment.intern('S5'), 4)
+        self.assertEqual(self.enrollment.roll_numbers[4], 'S5')
+
+    def test_roster_membership(self):
+        self.assertIn('S2', self.roster1)
+        self.assertIn(1, self.roster1)
+        self.assertNotIn('S4', self.roster1)
+        self.assertNotIn('unknown', self.roster1)
+        self.assertEqual(set(self.roster2), {'S2', 'S3', 'S4'})
+
+    def test_roster_intersection(self):
+        common = self.roster1 & self.roster2
+        self.assertEqual(set(common), {'S2', 'S3'})
+
+    def test_group_profiles(self):
+        # S2 and S3 take both courses, S1 and S4 one each
+        profile_ids, weights = self.enrollment.group_profiles([self.roster1.ids, self.roster2.ids])
+        self.assertEqual(profile_ids[0].tolist(), [0, 1])
+        self.assertEqual(profile_ids[1].tolist(), [1, 2])
+        self.assertEqual(weights.tolist(), [1, 2, 1])
+
+
+class TestExamOccupancy(unittest.TestCase):
+    def setUp(self):
+        self.occupancy = ExamOccupancy(no_of_students=4, max_days=3, max_slots=2)
+        self.students = np.array([0, 2])
+
+    def test_assign_color_updates_occupancy(self):
+        enrollment = Enrollment()
+        course = Course(1, 'CS101', enrollment.roster(['S1', 'S2']))
+        color = Color(day=1, slot=1)
+        color.occupancy = self.occupancy
+        course.assign_color(color)
+        self.assertEqual(self.occupancy.exams[0, 1, 1], 1)
+        self.assertEqual(self.occupancy.exams_per_day[1, 1], 1)
+        self.assertEqual(self.occupancy.exams[2].sum(), 0)
+
+    def test_excess_exams(self):
+        for slot in range(2):
+            self.occupancy.add(self.students, 0, slot)
+        self.occupancy.add(np.array([2]), 0, 1)
+        self.assertEqual(self.occupancy.excess_exams(), 1)
+        # Row 2 standing for three students
+        self.assertEqual(self.occupancy.excess_exams(np.array([1, 1, 3, 1])), 3)
 
 
 class TestStudent(unittest.TestCase):
@@ -137,6 +215,67 @@ class TestLectureHall(unittest.TestCase):
         self.assertFalse(self.hall.even_available)
 
 
+class TestHallIndex(unittest.TestCase):
+    def setUp(self):
+        self.color = Color(0, 0)
+        self.big = LectureHall('L1', 60, 60, 0, self.color)
+        self.small = LectureHall('L2', 20, 20, 5, self.color)
+        self.index = HallIndex(self.color.lecture_halls)
+
+    def test_best_fit(self):
+        self.assertEqual(self.index.allocate(18), {self.small: {'o': 18}})
+        self.assertEqual(self.index.allocate(5), {self.small: {'s': 5}})
+        self.assertEqual(self.index.allocate(0), {})
+
+    def test_largest_first_without_odd_and_even_together(self):
+        # 60 odd seats of L1, then L1's even block is off limits
+        self.assertEqual(self.index.allocate(75), {self.big: {'o': 60}, self.small: {'o': 15}})
+        self.assertEqual(self.index.allocate(200), {})
+
+    def test_update(self):
+        self.small.odd_capacity = 0
+        self.small.odd = 0
+        self.big.even_capacity = 10
+        self.index.update([self.small, self.big])
+        self.assertEqual(self.index.allocate(15), {self.small: {'e': 15}})
+
+
+class TestHallTable(unittest.TestCase):
+    def setUp(self):
+        self.table = HallTable(['L1', 'L2'], [(40, 40, 0), (10, 10, 2)], 2, 2)
+        self.color = Color(1, 0)
+        self.color.hall_table = self.table
+        self.hall = LectureHall('L2', 10, 10, 2, self.color, self.table, 1)
+
+    def test_totals(self):
+        self.assertEqual(self.table.free.shape, (2, 2, 2, 3))
+        self.assertEqual(self.color.capacity_available(), 102)
+        self.hall.odd_capacity -= 4
+        self.hall.assign_seats('s')
+        self.assertEqual(self.color.capacity_available(), 96)
+        self.assertEqual(self.hall.availability(), {"total": 16, "seats": (6, 10, 0)})
+        self.assertEqual(self.table.total(0, 0), 102)
+
+    def test_running_counters(self):
+        self.assertEqual(self.color.max_course_seats(), 40 + 10 + 2)
+        self.assertEqual(self.color.usable_halls(), 2)
+        self.hall.odd = 0
+        self.hall.even = 0
+        self.assertEqual(self.table.type_totals[1, 0].tolist(), [40, 40, 2])
+        self.assertEqual(self.color.max_course_seats(), 42)
+        self.hall.single = 0
+        self.assertEqual(self.color.usable_halls(), 1)
+        self.assertAlmostEqual(self.table.utilization()[1, 0], 22 / 102)
+
+    def test_copy_and_restore(self):
+        snapshot = self.table.copy()
+        self.hall.even = 0
+        self.assertEqual(snapshot.total(1, 0), 102)
+        self.table.restore(snapshot)
+        self.assertEqual(self.hall.even_capacity, 10)
+        self.assertEqual(self.color.capacity_available(), 102)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,345 @@
+import os
+import tempfile
+import unittest
+from models.course import Course
+from models.color import Color
+from models.enrollment import Enrollment
+from ordering import static_order, DSaturQueue
+from solver import solve_cp_sat, schedule_courses
+from decompose import find_components, group_components, decompose_schedule
+from local_search import ScheduleState, improve_schedule
+from day_search import minimum_colors, search_min_days
+from hall_assignment import pack_slot, allocation_cost
+from repair import load_previous_schedule, nearest_colors, repair_schedule
+from constraints import Constraints
+from models.occupancy import ExamOccupancy
+from scheduler import place_course, schedule_violations
+from utils import initialize_colors, initialize_schedule, build_courses, load_lecture_halls, occupancy_size
+import numpy as np
+from utils import build_incidence_matrix, build_conflict_matrix
+
+
+def make_course(id, degree, max_adjacency=0):
+    course = Course(id, f'C{id}', {f'S{id}'})
+    course.degree = degree
+    course.max_adjacency = max_adjacency
+    return course
+
+
+def link(*courses):
+    for course in courses:
+        course.adjacency_list.extend(c for c in courses if c is not course)
+
+
+class TestOrdering(unittest.TestCase):
+    def test_static_order(self):
+        c1, c2, c3 = make_course(1, 1, 5), make_course(2, 3), make_course(3, 1, 7)
+        self.assertEqual(static_order([c1, c2, c3]), [c2, c3, c1])
+
+    def test_dsatur_prefers_saturated_course(self):
+        # c1 has the highest degree, but c4 sees two distinct colors once c2 and c3 are colored
+        c1, c2, c3, c4 = make_course(1, 4), make_course(2, 2), make_course(3, 2), make_course(4, 2)
+        link(c2, c4)
+        link(c3, c4)
+        queue = DSaturQueue([c1, c2, c3, c4])
+
+        self.assertIs(queue.pop(), c1)
+        self.assertIs(queue.pop(), c2)
+        queue.colored(c2, Color(0, 0))
+        self.assertIs(queue.pop(), c4)
+        queue.colored(c4, Color(0, 1))
+        self.assertIs(queue.pop(), c3)
+        self.assertIsNone(queue.pop())
+
+    def test_dsatur_counts_distinct_colors(self):
+        c1, c2, c3 = make_course(1, 1), make_course(2, 1), make_course(3, 2)
+        link(c1, c3)
+        link(c2, c3)
+        queue = DSaturQueue([c1, c2, c3])
+        color = Color(0, 0)
+        queue.colored(c1, color)
+        queue.colored(c2, color)
+        self.assertEqual(len(queue.neighbour_colors[c3]), 1)
+
+
+class TestCpSat(unittest.TestCase):
+    def test_solve_separates_adjacent_courses(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S2', 'S3'], ['S1', 'S3'], ['S4']]
+        courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        incidence, _ = build_incidence_matrix([c.student_list for c in courses], enrollment)
+        graph = build_conflict_matrix(incidence).toarray()
+
+        assignment = solve_cp_sat(courses, graph, [10] * 12, 6, 2, time_limit=10, workers=1)
+
+        positions = [assignment[c] for c in courses[:3]]
+        self.assertEqual(len(set(positions)), 3)
+        # Spacing is soft but achievable here: adjacent courses at least 4 colors apart
+        flat = sorted(day * 2 + slot for day, slot in positions)
+        self.assertTrue(all(b - a >= 4 for a, b in zip(flat, flat[1:])))
+
+
+class TestScheduleViolations(unittest.TestCase):
+    def test_weighted_violations(self):
+        courses = [make_course(1, 2), make_course(2, 1), make_course(3, 1), make_course(4, 0)]
+        graph = np.zeros((4, 4), dtype=int)
+        graph[0, 1] = graph[1, 0] = 3
+        graph[0, 2] = graph[2, 0] = 2
+        color_matrix = initialize_colors(4, 2)
+        courses[0].assign_color(color_matrix[0][0])
+        courses[1].assign_color(color_matrix[0][1])  # consecutive and too close
+        courses[2].assign_color(color_matrix[2][0])  # 4 colors apart
+        violations = schedule_violations(courses, graph, color_matrix, 4, 2)
+        self.assertEqual(violations, {"consecutive": 3, "dis_3": 3, "three_exams": 0})
+
+
+class TestDecompose(unittest.TestCase):
+    def test_find_components(self):
+        graph = np.zeros((5, 5), dtype=int)
+        graph[0, 3] = graph[3, 0] = 2
+        graph[3, 4] = graph[4, 3] = 1
+        self.assertEqual(find_components(graph), [[0, 3, 4], [1], [2]])
+
+    def test_group_components(self):
+        groups = group_components([[0, 3, 4], [1, 5], [2], [6]], 2)
+        self.assertEqual(groups, [[0, 3, 4, 6], [1, 5, 2]])
+        self.assertEqual(group_components([[0]], 4), [[0]])
+
+    def test_components_competing_for_halls(self):
+        # Two unrelated courses that together outnumber the seats of a slot, and a small one
+        enrollment = Enrollment()
+        rosters = [[f'A{i}' for i in range(1800)], [f'B{i}' for i in range(1800)], ['C1', 'C2']]
+        rosters = [enrollment.roster(roster).ids for roster in rosters]
+        graph, courses = build_courses(['A', 'B', 'C'], rosters, enrollment)
+
+        color_matrix, unscheduled = decompose_schedule(courses, graph, enrollment, 1, 3, workers=2)
+        self.assertEqual(unscheduled, 0)
+        self.assertNotEqual(courses[0].color, courses[1].color)
+        # The small course joins a color in use instead of opening the third one
+        self.assertEqual(sum(bool(color.courses) for color in color_matrix[0]), 2)
+        self.assertTrue((color_matrix[0][0].hall_table.free >= 0).all())
+
+    def test_hall_share(self):
+        full = initialize_schedule(0, 1, 1)[0][0].capacity_available()
+        halved = initialize_schedule(0, 1, 1, hall_share=0.5)[0][0].capacity_available()
+        self.assertTrue(full / 2 <= halved < full / 2 + 3 * len(load_lecture_halls()))
+
+
+class TestLocalSearch(unittest.TestCase):
+    def setUp(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S2', 'S3'], ['S3', 'S4'], ['S5']]
+        self.courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        incidence, _ = build_incidence_matrix([c.student_list for c in self.courses], enrollment)
+        self.graph = build_conflict_matrix(incidence).toarray()
+        self.color_matrix = initialize_colors(3, 2)
+        for course, (day, slot) in zip(self.courses, [(0, 0), (0, 1), (1, 0), (2, 1)]):
+            course.assign_color(self.color_matrix[day][slot])
+        self.state = ScheduleState(self.courses, self.graph, [10] * 6, len(enrollment), 3, 2)
+
+    def test_kempe_chain(self):
+        self.assertEqual(sorted(self.state.kempe_chain(0, 1)), [0, 1])
+        self.assertEqual(self.state.kempe_chain(0, 5), [0])
+
+    def test_improve_needs_a_stop_criterion(self):
+        with self.assertRaises(ValueError):
+            improve_schedule(self.courses, None, None, 5, 3, 2, time_limit=None, max_iterations=None)
+
+    def test_improve_keeps_a_better_input(self):
+        # C4 was placed without halls and cannot be seated in a rebuilt schedule
+        self.courses[3].no_of_students = 10 ** 6
+        result, unscheduled, history = improve_schedule(
+            self.courses, self.graph, self.color_matrix, 5, 3, 2, time_limit=None, max_iterations=10, seed=1
+        )
+        self.assertIs(result, self.color_matrix)
+        self.assertEqual(unscheduled, 0)
+        self.assertEqual(len(history), 1)
+        self.assertIs(self.courses[3].color, self.color_matrix[2][1])
+
+    def test_relocate_delta_matches_total_cost(self):
+        cost = self.state.total_cost()
+        self.assertEqual(cost, 3)  # C1-C2 consecutive and close, C2-C3 close
+        delta = self.state.relocate([0, 1], [1, 0])
+        self.assertEqual(cost + delta, self.state.total_cost())
+        delta = self.state.relocate([0], [5])
+        self.assertEqual(self.state.total_cost(), 1)
+        self.assertEqual(delta, -2)
+
+
+class TestDaySearch(unittest.TestCase):
+    def test_minimum_colors(self):
+        courses = [make_course(1, 0), make_course(2, 0)]
+        self.assertEqual(minimum_colors(courses, 3, 2.5, [10]), 3)
+        self.assertEqual(minimum_colors(courses, 1, 4.0000001, [10]), 4)
+        self.assertEqual(minimum_colors(courses, 1, 0, [1]), 2)  # one student per slot
+
+    def test_search_stops_at_lower_bound(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S2', 'S3'], ['S1', 'S3']]
+        courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        incidence, _ = build_incidence_matrix([c.student_list for c in courses], enrollment)
+        graph = build_conflict_matrix(incidence).toarray()
+        link(*courses)
+        for course in courses:
+            course.degree = 2
+
+        days, color_matrix, lower = search_min_days(courses, graph, len(enrollment), 8, 1, 3, 0)
+        self.assertEqual((days, lower, len(color_matrix)), (3, 3, 3))
+        self.assertEqual(len({course.color for course in courses}), 3)
+
+
+class TestHallAssignment(unittest.TestCase):
+    def test_pack_slot_opens_fewer_halls(self):
+        capacity = [[20, 20, 0], [40, 40, 0], [10, 10, 0]]
+        # Greedy-style allocation spread over all three halls
+        current = [(0, 0, 0, 20), (0, 2, 0, 10), (1, 0, 1, 20), (1, 2, 1, 10)]
+        day, slot, allocation = pack_slot((1, 0, [30, 30], capacity, current), time_limit=5)
+
+        self.assertEqual((day, slot), (1, 0))
+        self.assertEqual(allocation_cost(allocation), (1, 2))
+        for i in range(2):
+            self.assertEqual(sum(seats for course, _, _, seats in allocation if course == i), 30)
+
+    def test_pack_slot_keeps_better_allocation(self):
+        capacity = [[40, 40, 0]]
+        self.assertIsNone(pack_slot((0, 0, [30], capacity, [(0, 0, 0, 30)])))
+
+
+class TestConstraints(unittest.TestCase):
+    def setUp(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S2', 'S3'], ['S1', 'S4'], ['S2']]
+        self.courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        link(self.courses[0], self.courses[1])
+        self.color_matrix = initialize_colors(3, 3, ExamOccupancy(len(enrollment), 3, 3))
+        self.constraints = Constraints(self.color_matrix, 3, 3)
+        # No halls: every color fits any number of students
+        self.constraints.room_capacity = lambda course: 0
+
+    def test_rule_sets(self):
+        self.courses[0].assign_color(self.color_matrix[0][0])
+        course = self.courses[1]
+        self.assertEqual(self.constraints.available(course, ()), 0b111111110)
+        self.assertEqual(self.constraints.available(course, ("no_consecutive_exams",)), 0b111111100)
+        self.assertEqual(self.constraints.available(course, ("minimum_gap",)), 0b111110000)
+        self.assertTrue(self.constraints.is_suitable(course, self.color_matrix[1][1]))
+
+    def test_maximum_exams_per_day(self):
+        self.courses[0].assign_color(self.color_matrix[1][0])
+        self.courses[1].assign_color(self.color_matrix[1][2])
+        # S2 of C4 already has two exams on day 1
+        self.assertEqual(self.constraints.maximum_exams_per_day(self.courses[3]), 0b000111000)
+        self.assertEqual(self.constraints.maximum_exams_per_day(self.courses[2]), 0)
+
+    def test_violations(self):
+        self.courses[0].assign_color(self.color_matrix[1][0])
+        self.courses[1].assign_color(self.color_matrix[1][2])
+        feasible, cost = self.constraints.evaluate(self.courses[3], ())
+        # S2 of C4 sits in colors 3 and 5 and has two exams on day 1
+        self.assertEqual(cost.tolist(), [1, 1, 2, 2, 5, 2, 2, 1, 1])
+        self.assertEqual(np.flatnonzero(feasible).tolist(), list(range(9)))
+        self.assertEqual(int(np.argmin(np.where(feasible, cost, np.inf))), 0)
+
+    def test_placement_is_per_call(self):
+        first, second = self.courses[:2]
+        for placement, slot in (("least_cost", 2), ("smallest", 1), (None, 1)):
+            for course in (first, second):
+                course.reset_schedule()
+            color_matrix = initialize_schedule(4, 1, 3)
+            first.assign_color(color_matrix[0][0])
+            # Only a relaxed rule set fits C2; least_cost keeps it off the consecutive slot
+            args = (placement,) if placement else ()
+            self.assertTrue(place_course(second, color_matrix, 1, 3, None, *args))
+            self.assertEqual(second.color.slot, slot)
+
+
+class TestKernel(unittest.TestCase):
+    def test_peeled_courses_are_restored(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S2', 'S3'], ['S1', 'S3'], ['S3', 'S4'], ['S5']]
+        courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        incidence, _ = build_incidence_matrix([c.student_list for c in courses], enrollment)
+        conflicts = build_conflict_matrix(incidence)
+        graph = conflicts.toarray()
+        for i, course in enumerate(courses):
+            course.adjacency_list.extend(courses[j] for j in conflicts[i].indices)
+            course.degree = len(course.adjacency_list)
+
+        color_matrix, unscheduled = schedule_courses(courses, graph, len(enrollment), 1, 3, kernelize=True)
+        self.assertEqual(unscheduled, 0)
+        self.assertEqual(len({course.color for course in courses[:3]}), 3)
+        self.assertNotEqual(courses[3].color, courses[2].color)
+        self.assertTrue(all(course.flag for course in courses))
+
+
+class TestProfiles(unittest.TestCase):
+    def test_occupancy_has_a_row_per_profile(self):
+        # S1 and S2 take the same two courses, S3 only the first
+        enrollment = Enrollment()
+        rosters = [enrollment.roster(r).ids for r in (['S1', 'S2', 'S3'], ['S1', 'S2'])]
+        graph, courses = build_courses(['C1', 'C2'], rosters, enrollment)
+        self.assertEqual(occupancy_size(courses, len(enrollment)), 2)
+
+        color_matrix, unscheduled = schedule_courses(courses, graph, len(enrollment), 2, 2)
+        self.assertEqual(unscheduled, 0)
+        self.assertEqual(color_matrix[0][0].occupancy.exams_per_day.shape, (2, 2))
+        state = ScheduleState(courses, graph, [10] * 4, len(enrollment), 2, 2)
+        self.assertEqual(state.row_weights.tolist(), [2, 1])
+        self.assertEqual(state.exams_per_day.sum(axis=1).tolist(), [2, 1])
+
+
+class TestRepair(unittest.TestCase):
+    def test_nearest_colors(self):
+        self.assertEqual(nearest_colors(2, 2, 2), [2, 1, 3, 0])
+
+    def test_load_previous_schedule(self):
+        # The exam_schedule.csv layout written by main
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'exam_schedule.csv')
+            with open(path, 'w') as f:
+                f.write('Course Code,No. of Students,Day,Slot\nC1,3,2,1\nC9,1,1,1\n')
+            courses = {code: Course(i + 1, code, {'S1'}) for i, code in enumerate(['C1', 'C2'])}
+            self.assertEqual(load_previous_schedule(courses, path), 1)
+        self.assertEqual((courses['C1'].old_day, courses['C1'].old_slot), (2, 1))
+        self.assertEqual((courses['C2'].old_day, courses['C2'].old_slot), (0, 0))
+        self.assertEqual(load_previous_schedule(courses, path), 0)
+
+    def test_only_conflicted_course_moves(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2', 'S3'], ['S3', 'S4'], ['S5']]
+        courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        courses[0].adjacency_list.append(courses[1])
+        courses[1].adjacency_list.append(courses[0])
+        # C1 and C2 now share S3 but were published in the same slot
+        for course, (day, slot) in zip(courses, [(1, 1), (1, 1), (2, 1)]):
+            course.old_day, course.old_slot = day, slot
+
+        color_matrix, unscheduled, moved, evicted = repair_schedule(courses, len(enrollment), 3, 2)
+        self.assertEqual(unscheduled, 0)
+        self.assertEqual(moved, [courses[1]])
+        self.assertEqual(evicted, [])
+        self.assertEqual((courses[0].color.day, courses[0].color.slot), (0, 0))
+        self.assertEqual((courses[2].color.day, courses[2].color.slot), (1, 0))
+        self.assertEqual((courses[1].color.day, courses[1].color.slot), (2, 0))
+
+    def test_kept_courses_are_evicted_in_a_tight_calendar(self):
+        enrollment = Enrollment()
+        rosters = [['S1', 'S2'], ['S3', 'S4'], ['S1', 'S3']]
+        courses = [Course(i + 1, f'C{i + 1}', enrollment.roster(r)) for i, r in enumerate(rosters)]
+        for a, b in [(0, 2), (1, 2)]:
+            courses[a].adjacency_list.append(courses[b])
+            courses[b].adjacency_list.append(courses[a])
+        # C1 and C2 keep both slots of the only day, new course C3 clashes with both
+        courses[0].old_day, courses[0].old_slot = 1, 1
+        courses[1].old_day, courses[1].old_slot = 1, 2
+
+        color_matrix, unscheduled, moved, evicted = repair_schedule(courses, len(enrollment), 1, 2)
+        self.assertEqual(unscheduled, 0)
+        self.assertEqual(len(moved), 1)
+        self.assertEqual(evicted, moved)
+        self.assertIsNot(courses[2].color, courses[0].color)
+        self.assertIs(courses[0].color, courses[1].color)
+
+
+if __name__ == '__main__':
+    unittest.main()
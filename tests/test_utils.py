@@ -0,0 +1,206 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import networkx as nx
+import numpy as np
+from scipy import sparse
+import artifact_cache
+from utils import build_incidence_matrix, build_conflict_matrix, extreme_eigenvalues
+from bounds import greedy_clique, max_clique, peel
+from graph_update import clashing_pairs, diff_pairs, patch_conflicts, update_cached_graph
+from models import Course, Enrollment
+from utils import link_courses
+
+
+class TestConflictMatrix(unittest.TestCase):
+    def setUp(self):
+        self.rosters = [
+            ['S1', 'S2', 'S3'],
+            ['S2', 'S3', 'S3'],
+            ['S4'],
+        ]
+
+    def test_incidence_matrix(self):
+        incidence, enrollment = build_incidence_matrix(self.rosters)
+        self.assertEqual(incidence.shape, (4, 3))
+        self.assertEqual(enrollment.student_index, {'S1': 0, 'S2': 1, 'S3': 2, 'S4': 3})
+        # Duplicate roll numbers are counted once
+        self.assertEqual(incidence[:, 1].sum(), 2)
+
+    def test_conflict_matrix(self):
+        incidence, _ = build_incidence_matrix(self.rosters)
+        conflicts = build_conflict_matrix(incidence).toarray()
+        self.assertEqual(conflicts[0, 1], 2)
+        self.assertEqual(conflicts[1, 0], 2)
+        self.assertEqual(conflicts[0, 2], 0)
+        self.assertEqual(conflicts.diagonal().tolist(), [0, 0, 0])
+
+
+class TestMaxClique(unittest.TestCase):
+    def adjacency(self, graph):
+        return {v: set(graph.adj[v]) for v in graph}
+
+    def test_exact_clique_number(self):
+        graph = nx.gnp_random_graph(60, 0.4, seed=3)
+        clique, exact = max_clique(self.adjacency(graph))
+        self.assertTrue(exact)
+        self.assertEqual(len(clique), max(len(c) for c in nx.find_cliques(graph)))
+        self.assertTrue(all(u in graph.adj[v] for u in clique for v in clique if u != v))
+
+    def test_time_limit_keeps_greedy_clique(self):
+        adjacency = self.adjacency(nx.gnp_random_graph(200, 0.6, seed=1))
+        clique, exact = max_clique(adjacency, time_limit=0)
+        self.assertFalse(exact)
+        self.assertEqual(len(clique), len(greedy_clique(adjacency)))
+
+
+class TestPeel(unittest.TestCase):
+    def test_core_and_removal_order(self):
+        # A triangle with a path hanging off it
+        adjacency = {0: {1, 2}, 1: {0, 2}, 2: {0, 1, 3}, 3: {2, 4}, 4: {3}}
+        core, peeled = peel(adjacency, 2)
+        self.assertEqual(core, [0, 1, 2])
+        self.assertEqual(peeled, [4, 3])
+        later = set(core)
+        for v in reversed(peeled):
+            self.assertLess(len(adjacency[v] & later), 2)
+            later.add(v)
+        self.assertEqual(peel(adjacency, 3), ([], [4, 3, 2, 1, 0]))
+
+
+class TestExtremeEigenvalues(unittest.TestCase):
+    def test_matches_dense_solver(self):
+        adjacency = nx.to_numpy_array(nx.gnp_random_graph(80, 0.1, seed=5))
+        eigenvalues = np.linalg.eigvalsh(adjacency)
+        lambda_max, lambda_min = extreme_eigenvalues(sparse.csr_matrix(adjacency))
+        self.assertAlmostEqual(lambda_max, eigenvalues[-1], places=6)
+        self.assertAlmostEqual(lambda_min, eigenvalues[0], places=6)
+
+    def test_small_matrices(self):
+        self.assertEqual(extreme_eigenvalues(sparse.csr_matrix((0, 0))), (0.0, 0.0))
+        lambda_max, lambda_min = extreme_eigenvalues(sparse.csr_matrix([[0.0, 1.0], [1.0, 0.0]]))
+        self.assertAlmostEqual(lambda_max, 1.0)
+        self.assertAlmostEqual(lambda_min, -1.0)
+
+    def test_no_shared_students(self):
+        incidence, _ = build_incidence_matrix([['a', 'b'], ['c'], ['d', 'e']])
+        adjacency = sparse.csr_matrix(build_conflict_matrix(incidence) != 0, dtype=float)
+        self.assertEqual(extreme_eigenvalues(adjacency), (0.0, 0.0))
+
+
+class TestArtifactCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(artifact_cache, 'CACHE_DIR', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_input_hash_follows_contents(self):
+        path = os.path.join(artifact_cache.CACHE_DIR, 'data.json')
+        with open(path, 'w') as f:
+            f.write('{"C1": ["S1"]}')
+        key = artifact_cache.input_hash([path])
+        self.assertEqual(artifact_cache.input_hash([path]), key)
+        with open(path, 'w') as f:
+            f.write('{"C1": ["S2"]}')
+        self.assertNotEqual(artifact_cache.input_hash([path]), key)
+
+    def test_graph_round_trip(self):
+        incidence, enrollment = build_incidence_matrix([['S1', 'S2'], ['S2', 'S3'], ['S4']])
+        conflicts = build_conflict_matrix(incidence)
+        rosters = [incidence[:, j].nonzero()[0].astype(np.int32) for j in range(3)]
+        self.assertIsNone(artifact_cache.load_graph('key'))
+
+        artifact_cache.save_graph('key', ['C1', 'C2', 'C3'], rosters, enrollment.roll_numbers, conflicts)
+        codes, loaded, roll_numbers, loaded_conflicts = artifact_cache.load_graph('key')
+        self.assertEqual(codes, ['C1', 'C2', 'C3'])
+        self.assertEqual([roster.tolist() for roster in loaded], [[0, 1], [1, 2], [3]])
+        self.assertEqual(roll_numbers, ['S1', 'S2', 'S3', 'S4'])
+        self.assertEqual((loaded_conflicts != conflicts).nnz, 0)
+
+    def test_bounds_and_clear(self):
+        artifact_cache.save_bounds('key', False, (9, True, 3.87))
+        self.assertEqual(artifact_cache.load_bounds('key', False), (9, True, 3.87))
+        self.assertIsNone(artifact_cache.load_bounds('key', True))
+        artifact_cache.clear_cache()
+        self.assertIsNone(artifact_cache.load_bounds('key', False))
+
+
+class TestGraphUpdate(unittest.TestCase):
+    def build(self, pairs):
+        # The stored graph (see artifact_cache.load_graph) of the pairs
+        rosters = {}
+        for roll_no, code in sorted(pairs):
+            rosters.setdefault(code, []).append(roll_no)
+        enrollment = Enrollment()
+        courses = [Course(i + 1, code, enrollment.roster(r)) for i, (code, r) in enumerate(rosters.items())]
+        graph = link_courses(courses, enrollment)
+        return list(rosters), [c.student_list.ids for c in courses], enrollment.roll_numbers, sparse.csr_matrix(graph)
+
+    def test_matches_rebuild(self):
+        old = {('S1', 'C1'), ('S1', 'C2'), ('S2', 'C2'), ('S2', 'C3'), ('S3', 'C3')}
+        new = {('S1', 'C1'), ('S2', 'C2'), ('S2', 'C3'), ('S3', 'C3'), ('S3', 'C1'), ('S4', 'C4'), ('S4', 'C1')}
+        added, removed = diff_pairs(old, new)
+        student_courses = {}
+        for roll_no, code in new:
+            student_courses.setdefault(roll_no, []).append(code)
+
+        codes, rosters, roll_numbers, conflicts, touched, new_edges = patch_conflicts(
+            *self.build(old), student_courses, added, removed
+        )
+        expected_codes, expected_rosters, expected_rolls, expected = self.build(new)
+        position = {code: i for i, code in enumerate(codes)}
+        for i, code in enumerate(expected_codes):
+            self.assertEqual({roll_numbers[k] for k in rosters[position[code]]},
+                             {expected_rolls[k] for k in expected_rosters[i]})
+            for j, other in enumerate(expected_codes):
+                self.assertEqual(conflicts[position[code], position[other]], expected[i, j])
+        self.assertEqual(set(new_edges), {('C1', 'C3'), ('C1', 'C4')})
+        self.assertEqual(set(touched), {'C1', 'C2', 'C4'})
+
+        positions = {'C1': ('1', '1'), 'C3': ('1', '1'), 'C4': ('2', '1')}
+        self.assertEqual(clashing_pairs(new_edges, positions), [('C1', 'C3')])
+
+    def test_patched_cache_matches_cold_build(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(artifact_cache, 'CACHE_DIR', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def cold_build(key, course_data):
+            # What build_weight_matrix stores for the course data
+            enrollment = Enrollment()
+            courses = [Course(i + 1, code, enrollment.roster(r)) for i, (code, r) in enumerate(course_data.items())]
+            graph = link_courses(courses, enrollment)
+            artifact_cache.save_graph(key, list(course_data), [c.student_list.ids for c in courses],
+                                      enrollment.roll_numbers, sparse.csr_matrix(graph))
+            return artifact_cache.load_graph(key)
+
+        old_data = {'C2': ['S3', 'S1'], 'C1': ['S1', 'S2']}
+        new_data = {'C5': ['S6', 'S2'], 'C2': ['S3', 'S5'], 'C4': ['S4', 'S5', 'S2'], 'C1': ['S1', 'S4']}
+        pairs = [{(roll_no, code) for code, students in data.items() for roll_no in students}
+                 for data in (old_data, new_data)]
+        student_courses = {}
+        for roll_no, code in pairs[1]:
+            student_courses.setdefault(roll_no, []).append(code)
+        course_file = os.path.join(directory.name, 'data_course.json')
+        with open(course_file, 'w') as f:
+            json.dump(new_data, f)
+
+        cold_build('old', old_data)
+        update_cached_graph('old', 'new', pairs[0], pairs[1], student_courses,
+                            os.path.join(directory.name, 'exam_schedule.csv'), course_file)
+        codes, rosters, roll_numbers, conflicts = artifact_cache.load_graph('new')
+        expected = cold_build('cold', new_data)
+        self.assertEqual(codes, expected[0])
+        self.assertEqual([roster.tolist() for roster in rosters], [roster.tolist() for roster in expected[1]])
+        self.assertEqual(roll_numbers, expected[2])
+        self.assertEqual((conflicts != expected[3]).nnz, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
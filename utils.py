@@ -5,13 +5,21 @@ import csv
 import networkx as nx
 import pandas as pd
 import os
+from functools import lru_cache
+from scipy import sparse
+from scipy.sparse.linalg import ArpackError, eigsh
 
 from models.course import Course
 from models.color import Color
 from models.student import Student
 from models.lecture_hall import LectureHall
+from models.hall_table import HallTable
+from models.enrollment import Enrollment, Roster
+from models.occupancy import ExamOccupancy
 from constraint import Problem
 from ortools.sat.python import cp_model
+from bounds import max_clique, CLIQUE_TIME_LIMIT
+from artifact_cache import load_graph, save_graph, save_bounds
 import csv
 
 #MAX_SCHEDULE_DAYS = 5
@@ -21,11 +29,37 @@ import networkx as nx
 import numpy as np
 import csv
 
-def compute_and_save_hoffman_bound(G, filename="bounds/hoffman_bound.csv"):
-    A = nx.to_numpy_array(G)
-    eigenvalues = np.linalg.eigvalsh(A)
-    lambda_max = max(eigenvalues)
-    lambda_min = min(eigenvalues)
+def extreme_eigenvalues(adjacency):
+    """
+    Largest and smallest eigenvalue of a symmetric sparse matrix, by Lanczos
+    iteration (eigsh); tiny matrices are solved densely. (0.0, 0.0) for a
+    matrix without entries or one ARPACK fails on, which makes the Hoffman
+    bound the trivial 1.
+    """
+    n = adjacency.shape[0]
+    if n == 0 or adjacency.nnz == 0:
+        return 0.0, 0.0
+    if n < 3:
+        eigenvalues = np.linalg.eigvalsh(adjacency.toarray())
+        return float(eigenvalues[-1]), float(eigenvalues[0])
+
+    # Fixed start vector, so the bound is the same on every run
+    start = np.random.default_rng(0).random(n)
+    try:
+        lambda_max = eigsh(adjacency, k=1, which='LA', v0=start, return_eigenvectors=False)[0]
+        lambda_min = eigsh(adjacency, k=1, which='SA', v0=start, return_eigenvectors=False)[0]
+    except ArpackError:
+        return 0.0, 0.0
+    return float(lambda_max), float(lambda_min)
+
+
+def compute_and_save_hoffman_bound(matrix, filename="bounds/hoffman_bound.csv"):
+    """
+    Hoffman bound 1 - lambda_max / lambda_min on the chromatic number, from the
+    (dense or sparse) conflict matrix taken as an unweighted adjacency matrix.
+    """
+    adjacency = sparse.csr_matrix(matrix != 0, dtype=float)
+    lambda_max, lambda_min = extreme_eigenvalues(adjacency)
 
     if lambda_min >= 0:
         bound = 1
@@ -39,24 +73,33 @@ def compute_and_save_hoffman_bound(G, filename="bounds/hoffman_bound.csv"):
         writer.writerow(["Lambda Max", "Lambda Min", "Hoffman Bound"])
         writer.writerow([round(lambda_max, 4), round(lambda_min, 4), round(bound, 4)])
 
-    with open("bounds/scheduling_summary.txt", "a") as f:
-        f.write(f"Hoffman Bound: {round(bound, 4)}\n")
-
     print(f"Hoffman bound saved to {filename}")
+    return bound
+
+def compute_cliques(G, course_codes, enumerate_all=False, time_limit=CLIQUE_TIME_LIMIT):
+    """
+    Find the clique number of the conflict graph with a time-limited branch
+    and bound and save the largest clique. Every maximal clique is only
+    enumerated into bounds/clique.csv when enumerate_all is set, as that is
+    exponential in the worst case.
+    Returns the clique number and whether it is exact (the search did not time out).
+    """
+    if enumerate_all:
+        raw_cliques = list(nx.find_cliques(G))
+        exact = True
+    else:
+        clique, exact = max_clique({v: set(G.adj[v]) for v in G}, time_limit)
+        raw_cliques = [clique] if clique else []
 
-def compute_cliques(G, courses):
-    # Step 4: Find unique cliques (as sets of course codes)
-    raw_cliques = list(nx.find_cliques(G))
     unique_cliques = set()
 
     for clique in raw_cliques:
-        course_codes = frozenset(courses[i].course_code for i in clique)
-        unique_cliques.add(course_codes)
+        unique_cliques.add(frozenset(course_codes[i] for i in clique))
 
-    # Step 5: Sort cliques by size
+    # Sort cliques by size
     sorted_cliques = sorted(unique_cliques, key=len, reverse=True)
 
-    # Step 6: Save to CSV
+    # Save to CSV
     # Ensure the directory exists
     os.makedirs("bounds", exist_ok=True)
     with open("bounds/clique.csv", mode='w', newline='') as file:
@@ -68,10 +111,8 @@ def compute_cliques(G, courses):
 
     clique_number = len(sorted_cliques[0]) if sorted_cliques else 0
 
-    with open("bounds/scheduling_summary.txt", "a") as f:
-        f.write(f"Clique Number (Largest Clique Size): {clique_number}\n")
-
     print("Cliques saved to 'bounds/clique.csv'.")
+    return clique_number, exact
 
 
 def calculate_common_students(c1, c2):
@@ -81,12 +122,56 @@ def calculate_common_students(c1, c2):
     return len(set(c1.student_list).intersection(c2.student_list))
 
 
+def build_incidence_matrix(course_rosters, enrollment=None):
+    """
+    Build the sparse student x course incidence matrix.
+
+    Roll numbers are interned to dense ids through the enrollment (rows) and
+    columns follow the order of course_rosters, so the common-student counts
+    of every course pair are given by A.T @ A. Rosters may be Roster objects
+    or plain lists of roll numbers.
+    """
+    if enrollment is None:
+        enrollment = Enrollment()
+    rosters = [
+        roster if isinstance(roster, Roster) else enrollment.roster(roster)
+        for roster in course_rosters
+    ]
+
+    rows = np.concatenate([roster.ids for roster in rosters]) if rosters else np.zeros(0, dtype=np.int32)
+    cols = np.repeat(np.arange(len(rosters)), [len(roster) for roster in rosters])
+    data = np.ones(len(rows), dtype=np.int32)
+    incidence = sparse.csr_matrix(
+        (data, (rows, cols)),
+        shape=(len(enrollment), len(rosters)),
+    )
+    return incidence, enrollment
+
+
+def build_conflict_matrix(incidence):
+    """
+    Number of common students for every course pair, as a sparse CSR matrix
+    with an empty diagonal and sorted column indices.
+    """
+    conflicts = (incidence.T @ incidence).tocsr()
+    conflicts.setdiag(0)
+    conflicts.eliminate_zeros()
+    conflicts.sort_indices()
+    return conflicts
+
+
 def calculate_degree(matrix, courses):
     """
-    Calculate the degree (number of conflicts) for each course based on the adjacency matrix.
+    Calculate the degree (number of conflicts) and the maximum adjacency for each course
+    based on the adjacency matrix.
     """
-    for i in range(len(courses)):
-        courses[i].degree = np.sum(matrix[i] != 0)
+    conflicts = sparse.csr_matrix(matrix)
+    conflicts.eliminate_zeros()
+    degrees = np.diff(conflicts.indptr)
+    max_adjacency = conflicts.max(axis=1).toarray().ravel() if conflicts.nnz else np.zeros(len(courses))
+    for course, degree, heaviest in zip(courses, degrees.tolist(), max_adjacency.tolist()):
+        course.degree = degree
+        course.max_adjacency = heaviest
 
     # Sort courses by degree in descending order
     sorted_courses = sorted(courses, key=lambda c: c.degree, reverse=True)
@@ -108,42 +193,96 @@ def calculate_degree(matrix, courses):
 
     print("Degrees saved to 'bounds/degree.csv'.")
 
-    # Build graph and find largest clique
+
+def compute_bounds(matrix, course_codes, enumerate_cliques=False, cache_key=None):
+    """
+    Lower bounds on the colors of the conflict graph: the clique number and the
+    Hoffman bound, saved under bounds/. Needs nothing but plain data, so it can run
+    in a worker process. Returns (clique number, whether it is exact, Hoffman bound),
+    also stored in the artifact cache under cache_key if given.
+    """
+    conflicts = sparse.csr_matrix(matrix)
+    conflicts.eliminate_zeros()
+
+    # Build graph from the upper triangle, weighted by common students, and find largest clique
+    upper = sparse.triu(conflicts, k=1).tocoo()
     G = nx.Graph()
-    for i in range(len(matrix)):
-        for j in range(i + 1, len(matrix)):
-            if matrix[i][j] != 0:
-                G.add_edge(i, j)
+    G.add_weighted_edges_from(zip(upper.row.tolist(), upper.col.tolist(), upper.data.tolist()))
+
+    clique_number, exact = compute_cliques(G, course_codes, enumerate_cliques)
+    hoffman_bound = compute_and_save_hoffman_bound(conflicts)
+    if cache_key:
+        save_bounds(cache_key, enumerate_cliques, (clique_number, exact, hoffman_bound))
+    return clique_number, exact, hoffman_bound
 
-    compute_cliques(G, courses)
-    compute_and_save_hoffman_bound(G)
+
+def write_bounds_summary(bounds, filename="bounds/scheduling_summary.txt"):
+    """
+    Append the result of compute_bounds to the scheduling summary.
+    """
+    clique_number, exact, hoffman_bound = bounds
+    with open(filename, "a") as f:
+        note = "" if exact else " (at least; clique search timed out)"
+        f.write(f"Clique Number (Largest Clique Size): {clique_number}{note}\n")
+        f.write(f"Hoffman Bound: {round(hoffman_bound, 4)}\n")
 
 
 
-def initialize_colors(max_days, max_slots):
+def initialize_colors(max_days, max_slots, occupancy=None):
     """
     Initialize the color matrix with Color objects for each day and time slot.
+    All colors share the given exam occupancy index, if any.
     """
     color_matrix = [[None for _ in range(max_slots)] for _ in range(max_days)]
 
     for day in range(max_days):
         for slot in range(max_slots):
             new_color = Color(day, slot)
+            new_color.occupancy = occupancy
+            new_color.set_grid(max_days, max_slots)
             color_matrix[day][slot] = new_color
 
     return color_matrix
 
 
-def build_weight_matrix():
+def load_cached_courses(cache_key, enrollment):
+    """
+    Linked courses of an artifact cache entry, their roll numbers interned into
+    the enrollment. Returns (weight matrix, courses, course index) or None on a miss.
+    """
+    cached = load_graph(cache_key)
+    if cached is None:
+        return None
+    codes, rosters, roll_numbers, conflicts = cached
+    student_ids = np.array([enrollment.intern(roll) for roll in roll_numbers], dtype=np.int32)
+    courses = [
+        Course(i + 1, code, Roster(enrollment, np.unique(student_ids[roster])))
+        for i, (code, roster) in enumerate(zip(codes, rosters))
+    ]
+    assign_profiles(courses, enrollment)
+    graph = attach_conflicts(courses, conflicts)
+    return graph, courses, {course.course_code: course for course in courses}
+
+
+def build_weight_matrix(enrollment=None, cache_key=None):
     """
     Build the weight matrix representing course conflicts and initialize courses.
+    Roll numbers are interned into the given enrollment (a new one if None) and
+    every course carries its roster as sorted student ids.
+
+    With a cache_key (see artifact_cache.input_hash) the courses and conflict
+    matrix are loaded from the artifact cache when present, and stored otherwise.
     """
+    if enrollment is None:
+        enrollment = Enrollment()
+
+    cached = load_cached_courses(cache_key, enrollment) if cache_key else None
+    if cached is not None:
+        return cached
+
     with open('data/data_course.json', 'r') as data_file:
         course_data = json.load(data_file)
 
-    with open('data/mid_sem_exam_schedule.json', 'r') as data_file:
-        exam_data = json.load(data_file)
-
     course_index = {}
     courses = []
     counter = 1
@@ -152,16 +291,8 @@ def build_weight_matrix():
     for course_code, students in course_data.items():
         if not students:
             continue
-        """"
         try:
-            old_day, old_slot = exam_data[course_code][0], exam_data[course_code][1]
-            crs = Course(counter, course_code, students, old_day, old_slot)
-        except KeyError:
-            err_courses.append(course_code)
-            crs = Course(counter, course_code, students, 0, 0)
-        """
-        try:
-            crs = Course(counter, course_code, students)
+            crs = Course(counter, course_code, enrollment.roster(students))
         except KeyError:
             err_courses.append(course_code)
         courses.append(crs)
@@ -171,44 +302,140 @@ def build_weight_matrix():
     with open('err_courses.txt', 'w') as out:
         out.write(str(err_courses))
 
-    total = len(courses)
-    graph = np.zeros((total, total), dtype=int)
+    graph = link_courses(courses, enrollment)
+    if cache_key:
+        save_graph(
+            cache_key, [course.course_code for course in courses],
+            [course.student_list.ids for course in courses], enrollment.roll_numbers,
+            sparse.csr_matrix(graph),
+        )
+    return graph, courses, course_index
+
 
-    # Assigning weights to matrix
-    for i in range(total):
-        for j in range(i + 1, total):
-            graph[i, j] = calculate_common_students(courses[i], courses[j])
-            graph[j, i] = graph[i, j]
+def build_courses(codes, rosters, enrollment, conflicts=None):
+    """
+    Rebuild linked courses from course codes and student-id rosters, without
+    reading the data files. The sparse conflict matrix is computed unless
+    given. Returns the weight matrix and the courses, with degrees set.
+    """
+    courses = [
+        Course(i + 1, code, Roster(enrollment, student_ids))
+        for i, (code, student_ids) in enumerate(zip(codes, rosters))
+    ]
+    if conflicts is None:
+        graph = link_courses(courses, enrollment)
+    else:
+        assign_profiles(courses, enrollment)
+        graph = attach_conflicts(courses, conflicts)
+    for course in courses:
+        course.degree = len(course.adjacency_list)
+    return graph, courses
 
-    # Adding adjacent courses to adjacency lists
-    for i in range(total):
-        courses[i].max_adjacency = np.max(graph[i])
-        for j in range(total):
-            if graph[i, j] > 0:
-                courses[i].adjacency_list.append(courses[j])
 
-    return graph, courses, course_index
+def link_courses(courses, enrollment):
+    """
+    Build the weight matrix of the given courses and fill their adjacency lists and max_adjacency.
+    """
+    incidence, _ = build_incidence_matrix([course.student_list for course in courses], enrollment)
+    assign_profiles(courses, enrollment)
+    return attach_conflicts(courses, build_conflict_matrix(incidence))
+
+
+def assign_profiles(courses, enrollment):
+    """
+    Group the students of the courses into enrollment profiles, so the exam
+    occupancy of a schedule is kept once per profile instead of per student.
+    Courses built from raw roll numbers (no student ids) keep per-student rows.
+    """
+    if any(course.student_ids is None for course in courses):
+        return
+    profile_ids, weights = enrollment.group_profiles([course.student_ids for course in courses])
+    for course, ids in zip(courses, profile_ids):
+        course.profile_ids = ids
+        course.profile_weights = weights
 
 
-def initialize_lecture_halls(color_matrix, max_days, max_slots):
+def attach_conflicts(courses, conflicts):
     """
-    Initialize lecture halls and assign them to each color (day-slot).
+    Fill the adjacency lists and max_adjacency of the courses from their sparse
+    conflict matrix and return it as the dense weight matrix.
+    """
+    graph = conflicts.toarray().astype(int)
+
+    # Adding adjacent courses to adjacency lists from the nonzero pattern
+    for i in range(len(courses)):
+        start, end = conflicts.indptr[i], conflicts.indptr[i + 1]
+        weights = conflicts.data[start:end]
+        courses[i].max_adjacency = weights.max() if end > start else 0
+        courses[i].adjacency_list.extend(courses[j] for j in conflicts.indices[start:end])
+
+    return graph
+
+
+@lru_cache(maxsize=None)
+def load_lecture_halls():
+    """
+    Hall capacities (number -> [odd, even, single]), read once and shared by every schedule built.
     """
     with open('data/lecture_halls.json', 'r') as data_file:
-        data = json.load(data_file)
+        return json.load(data_file)
+
+
+def initialize_lecture_halls(color_matrix, max_days, max_slots, hall_share=1.0):
+    """
+    Initialize the seat table of the lecture halls and assign a hall object to each color (day-slot).
+    With hall_share below 1, every hall only offers that fraction of its seats (rounded up).
+    """
+    data = load_lecture_halls()
+    capacities = [capacity[:3] for capacity in data.values()]
+    if hall_share < 1:
+        capacities = [[int(np.ceil(seats * hall_share)) for seats in capacity] for capacity in capacities]
+    table = HallTable(list(data), capacities, max_days, max_slots)
 
     lecture_halls = []
 
     for day in range(max_days):
         for slot in range(max_slots):
             color = color_matrix[day][slot]
-            for number, capacity in data.items():
-                lec_hall = LectureHall(number, capacity[0], capacity[1], capacity[2], color)
-                lecture_halls.append(lec_hall)
-                color.lecture_halls.append(lec_hall)
+            color.hall_table = table
+            for index, number in enumerate(table.numbers):
+                lecture_halls.append(LectureHall(number, *table.capacity[index], color, table, index))
+            color.index_halls()
     return lecture_halls
 
 
+def occupancy_size(courses, no_of_students):
+    """
+    Rows of the exam occupancy of a schedule of the courses: one per enrollment
+    profile when they are grouped (see assign_profiles), else one per student.
+    """
+    if courses and courses[0].profile_weights is not None:
+        return len(courses[0].profile_weights)
+    return no_of_students
+
+
+def initialize_schedule(no_of_students, max_days, max_slots, hall_share=1.0):
+    """
+    Initialize an empty schedule: the color matrix, its exam occupancy index and its lecture halls
+    (hall_share of their seats, see initialize_lecture_halls).
+    """
+    occupancy = ExamOccupancy(no_of_students, max_days, max_slots)
+    color_matrix = initialize_colors(max_days, max_slots, occupancy)
+    initialize_lecture_halls(color_matrix, max_days, max_slots, hall_share)
+    return color_matrix
+
+
+def get_slot_capacity(color_matrix, max_days, max_slots):
+    """
+    Total free seats in the lecture halls of every color, in flat day * max_slots + slot order.
+    """
+    return [
+        color_matrix[day][slot].capacity_available()
+        for day in range(max_days)
+        for slot in range(max_slots)
+    ]
+
+
 def initialize_students(course_index, max_days, max_slots):
     """
     Initialize students with their enrolled courses.
@@ -235,91 +462,6 @@ def initialize_students(course_index, max_days, max_slots):
     return student_list
 
 
-def binary_search(alist, item):
-    """
-    Perform binary search to find the insertion index for a lecture hall based on capacity.
-    """
-    first = 0
-    last = len(alist) - 1
-    found = False
-    """
-    while first <= last and not found:
-        midpoint = (first + last) // 2
-        if alist[midpoint][1] == item:
-            found = True
-            last = midpoint - 1
-        else:
-            if item < alist[midpoint][1]:
-                last = midpoint - 1
-            else:
-                first = midpoint + 1
-    return last + 1
-    """
-    return first
-
-
-def get_lecture_hall(max_students, sorted_list, max_days, max_slots):
-    """
-    Select a combination of lecture halls to accommodate the maximum number of students.
-    """
-    lecturehall_list = list(sorted_list)  # Make a mutable copy
-    selected_lecture_halls = {}
-
-    while max_students > 0 and lecturehall_list:
-        i = binary_search(lecturehall_list, max_students)
-        if i < 0:
-            i = 0
-        elif i >= len(lecturehall_list):
-            i = len(lecturehall_list) - 1
-
-        if i < 0:
-            selected_lecture_halls = {}
-            break
-        """
-        seats = lecturehall_list[i][1]
-        max_students -= seats
-
-        lecturehall_object = lecturehall_list[i][0][0]
-        seating_type = lecturehall_list[i][0][1]
-
-        del lecturehall_list[i]
-
-        selected_lecture_halls[lecturehall_object] = seating_type
-
-        lecturehall_list = [
-            lh for lh in lecturehall_list 
-            if lh[0][0].number != lecturehall_object.number
-        ]
-        """
-        seats = lecturehall_list[i][1]
-        lecturehall_object = lecturehall_list[i][0][0]
-        seating_type = lecturehall_list[i][0][1]
-        if lecturehall_object not in selected_lecture_halls:
-                selected_lecture_halls[lecturehall_object] = {}  # Initialize dictionary
-        if(seats>max_students):
-            selected_lecture_halls[lecturehall_object][seating_type] = max_students
-            lecturehall_list[i] = [(lecturehall_object, seating_type), seats - max_students]
-            max_students = 0
-        else:
-            selected_lecture_halls[lecturehall_object][seating_type] = seats
-            del lecturehall_list[i]
-            max_students -= seats
-
-        lecturehall_list = [
-            lh for lh in lecturehall_list 
-            if (lh[0][0].number != lecturehall_object.number or 
-                (lh[0][0].number == lecturehall_object.number and lh[0][1]=='s' and seating_type=='o') or
-                (lh[0][0].number == lecturehall_object.number and lh[0][1]=='s' and seating_type=='e') or
-                (lh[0][0].number == lecturehall_object.number and lh[0][1]=='o' and seating_type=='s') or
-                (lh[0][0].number == lecturehall_object.number and lh[0][1]=='e' and seating_type=='s')
-            )
-        ]
-
-
-    if max_students > 0:
-        return {}
-
-    return selected_lecture_halls
 '''
 def output_to_csv(time_slots, max_schedule_days, color_matrix):
     """